@@ -26,17 +26,43 @@ Known issues:
 #!/usr/bin/python
 import sys
 import os
+import io
+import gzip
+import zlib
+import struct
+import threading
+import queue
+import shutil
+import heapq
+import itertools
+import csv
+import json
+import concurrent.futures
+import functools
+import collections
+import hashlib
+import time
+import shapely
 from shapely import Point, Polygon, LineString, GeometryCollection, MultiLineString, MultiPolygon
 from shapely.ops import nearest_points
-from shapely.ops import linemerge, unary_union
+from shapely.ops import linemerge
 import matplotlib.pyplot as plt
 import numpy as np
 from ast import literal_eval
 import warnings
+import logging
 import random
 import platform
 #from hilbertcurve.hilbertcurve import HilbertCurve
 from hilbert import decode, encode
+
+#all messages go to this logger, the command line shows them on stdout. When imported as library nothing is printed unless the logger is configured.
+logger=logging.getLogger("arc_overhang")
+logger.addHandler(logging.NullHandler())
+
+def log(*args)->None:
+    """print() replacement, the message is logged with level INFO."""
+    logger.info(" ".join(str(arg) for arg in args))
 ########## Parameters  - adjust values here as needed ##########
 def makeFullSettingDict(gCodeSettingDict:dict) -> dict: 
     """Merge Two Dictionarys and set some keys/values explicitly"""
@@ -51,12 +77,22 @@ def makeFullSettingDict(gCodeSettingDict:dict) -> dict:
         #"ArcPrintTemp":gCodeSettingDict.get("temperature"), # unit: Celsius
         "ArcTravelFeedRate":30*60, # slower travel speed, Unit:mm/min
         "ExtendIntoPerimeter":1.5*gCodeSettingDict.get("perimeter_extrusion_width"), #min=0.5extrusionwidth!, extends the Area for arc generation, put higher to go through small passages. Unit:mm
+        "InfillBufferQuadSegs":8, # segments per quarter circle at the round ends of the extended infill lines. Less is faster, the detected areas get slightly less round.
+        "InfillBufferJoinStyle":"round", # corners of the extended infill lines: "round", "mitre" or "bevel".
+        "InfillMergeGridSize":0.01*gCodeSettingDict.get("perimeter_extrusion_width"), # the merged infill areas are snapped to a grid of this size, speeds up the union of many overlapping lines. 0=off. Unit:mm
+        "InfillMergeSimplifyTolerance":0.05*gCodeSettingDict.get("perimeter_extrusion_width"), # the merged infill areas are simplified with this tolerance to keep the number of points low. 0=off. Unit:mm
         "MaxDistanceFromPerimeter":2*gCodeSettingDict.get("perimeter_extrusion_width"),#Control how much bumpiness you allow between arcs and perimeter. lower will follow perimeter better, but create a lot of very small arcs. Should be more that 1 Arcwidth! Unit:mm
         "MinArea":5*10,#Unit:mm2
         "MinBridgeLength":5,#Unit:mm
         "Path2Output":r"", #leave empty to overwrite the file or write to a new file. Full path required.
+        "OutputFormat":"auto", # "auto": same format as the input file. "gcode": plain text, "gzip": compressed text, "bgcode": PrusaSlicer binary gcode (needs a bgcode input).
+        "PipelineQueueSize":16, # number of layers buffered between the reading, the arc generation and the writing. These run in parallel, reading and writing happen in background threads.
+        "AnalyzeOnly":False, # only detect the overhangs and write a report (<input>_analysis.json) with area, size, start line, predicted number of arcs and runtime of each overhang and the layers with special cooling. No gcode is written.
+        "Sweep":{}, # grid of values to try, e.g. {"ArcWidth":[0.4,0.45],"RMax":[10,20]}. Writes one file per combination next to the input and a csv with filling, number of arcs and runtime. The input stays unchanged. Only parameters of the arc generation can be swept.
+        "SweepWorkers":0, # number of parallel processes for the sweep. 0=one per cpu.
         "RMax":110, # the max radius of the arcs.
         "TimeLapseEveryNArcs": 0, #deactivate with 0, inserts M240 after N ArcLines, 5 is a good value to start.
+        "CorrectPrintTime":True, # estimate how much the modified layers change the print time and correct the progress (M73) and the estimated printing time. The layers are written while processing, the corrected times are filled in by a second pass over the written file.
 
         #Special cooling to prevent warping:
         "aboveArcsFanSpeed":25, #0->255, 255=100%
@@ -75,15 +111,37 @@ def makeFullSettingDict(gCodeSettingDict:dict) -> dict:
         "CornerImportanceMultiplier":0.2, # Startpoint for Arc generation is chosen close to the middle of the StartLineString and at a corner. Higher=>Cornerselection more important.
         "DistanceBetweenPointsOnStartLine":0.1,#used for redestribution, if start fails.
         "GCodeArcPtMinDist":0.1, # min Distance between points on the Arcs to for seperate GCode Command. Unit:mm
+        "ArcSimplifyTolerance":0.01, # points of the arcs are left out as long as the moves stay closer than this to the arc, fewer gcode lines. Only for ArcGCodeMode "G1". 0=off. Unit:mm
+        "ArcGCodeMode":"G1", # "G1": arcs are written as many short lines. "G2G3": the circular parts of the arcs are written as G2/G3 arc moves, far fewer gcode lines. Needs firmware support for arc moves.
+        "ArcFitTolerance":0.02, # max deviation between the arc move and the points of the arc for "G2G3". Unit:mm
         "ExtendArcDist":1.0, # extend Arcs tangentially for better bonding bewteen them, only end-piece affected(yet), Unit:mm
         "HilbertFillingPercentage":100, # infillpercentage of the massive layers with special cooling. Uses Hilbert Curve, works not quite right yet.
         "HilbertInfillExtrusionMultiplier":1.05, 
+        "HilbertMergeCollinear":True, # straight runs of the hilbert curve are written as one move instead of one move per point.
+        "SolidFillCacheSize":64, # the solid infill areas and hilbert curves above the overhangs are often the same for many layers, the last N are kept and reused. 0=off.
         "HilbertTravelEveryNSeconds":6, # when N seconds are driven it will continue printing somewhere else (very rough approx).
+        "HilbertMinChunkDistance":10, # the next hilbert piece is at least this far away from the last one (centers), against local overheating. Unit:mm
+        "OptimizeTravel":True, # reorder the arcs to shorten the travel moves, arcs are still printed after the arc they start from.
+        "TravelOptimizationPasses":10, # max number of 2-opt passes over the arc order.
         "MinStartArcs":2, # how many arcs shall be generated in first step
+        "StartPtCandidates":10, # if the best startpoint gives less than MinStartArcs, the next best ranked points are tried. Number of points per StartLineString.
+        "StartPtRandomCandidates":10, # if all ranked startpoints fail, try this many random points on the StartLineString.
+        "StartPtRetrySeed":0, # seed for the random startpoints, same seed=>same result.
         "PointsPerCircle":80, # each Arc starts as a discretized circle. Higher will slow down the code but give more accurate results for the arc-endings. 
+        "CircleDiscretization":"fixed", # "fixed": every circle has PointsPerCircle points. "chorderror": the number of points depends on the radius, small arcs get less, large arcs more points. Usually faster and more accurate.
+        "MaxChordError":0.01, # max distance between the discretized and the true circle for "chorderror". Unit:mm
         "SafetyBreak_MaxArcNumber":2000, #max Number of Arc Start Points. prevents While loop form running for ever.
+        "TimeBudgetPerPolygon":0, # max time for the arc generation of one overhang. After half of it the circles get coarser, after 3/4 MaxDistanceFromPerimeter is doubled, after the full time the original bridge infill is kept for this overhang. 0=unlimited. Unit:s
+        "ReuseDuplicatedOverhangs":True, # overhangs that are only shifted copies of an overhang in the same layer (multiple instances of an object) get the arcs of the first one, shifted to their position. Generates the arcs once per unique shape.
+        "DuplicateTolerance":0.1*gCodeSettingDict.get("perimeter_extrusion_width"), # max difference of the outlines for two overhangs to be seen as copies, should be larger than InfillMergeSimplifyTolerance. Unit:mm
+        "TimeBudgetPerFile":0, # max time for the arc generation of all overhangs in the file, the remaining time limits the budget of each overhang the same way. 0=unlimited. Unit:s
         "WarnBelowThisFillingPercentage":90, # fill the overhang at least XX%, else send a warning. Easier detection of errors in small/delicate areas. Unit:Percent
         "UseLeastAmountOfCenterPoints":True, # always generates arcs until rMax is reached, divide the arcs into pieces in needed. reduces the amount of centerpoints.
+        "ArcSeedingEngine":"farthestpoint", # how the next arc center is chosen. "farthestpoint": breadth first search over all arcs. "distancefield": continue at the free spot farthest from the perimeter, looked up in a distance field computed once per overhang. Fewer arcs on large, irregular overhangs.
+        "DistanceFieldResolution":0.5, # cell size of the distance field as fraction of the ArcWidth. Only used by the distancefield engine.
+        "ArcEngine":"exact", # "exact": arcs from polygon boolean operations. "raster": arcs stamped into an occupancy grid, arc ends are less precise. Its runtime hardly depends on the shape, so it can pay off on complicated overhangs, but it is slower on simple ones, check with BenchmarkArcEngines.
+        "RasterResolution":0.25, # cell size of the occupancy grid as fraction of the ArcWidth. Only used by the raster engine.
+        "BenchmarkArcEngines":False, # run all arc engines on every overhang and print filling percentage and runtime. The arcs of 'ArcEngine' are used.
     
         #settings for easier debugging:
         "plotStart":False, # plot the detected geoemtry in the prev Layer and the StartLine for Arc-Generation, use for debugging
@@ -99,175 +157,225 @@ def makeFullSettingDict(gCodeSettingDict:dict) -> dict:
 ################################# MAIN FUNCTION #################################
 #################################################################################    
 #at the top, for better reading
-def main(gCodeFileStream,path2GCode,skipInput)->None:
-    '''Here all the work is done, therefore it is much to long.'''
-    gCodeLines=gCodeFileStream.readlines()
-    gCodeSettingDict=readSettingsFromGCode2dict(gCodeLines,{"Fallback_nozzle_diameter":0.4,"Fallback_filament_diameter":1.75}) #ADD FALLBACK VALUES HERE
+def main(gCodeFileStream,path2GCode,skipInput,overrides:dict=None)->None:
+    '''Entry point of the command line and PrusaSlicer: processes the file and overwrites it or writes to Path2Output.'''
+    inputFormat=detectGCodeFormat(path2GCode)
+    settingLines=readSettingLines(gCodeFileStream,path2GCode) # the slicer settings are needed before the first layer is processed
+    try:
+        parameters=makeParameters(settingLines,overrides)
+    except ValueError:
+        input("Can not run script, gcode unmodified. Press enter to close.")
+        raise
+    if parameters.get("AnalyzeOnly"):
+        analyzeOverhangs(gCodeFileStream,path2GCode,parameters)
+        if not skipInput:
+            input("Press enter to exit.")
+        return
+    if parameters.get("Sweep"):
+        runSweep(gCodeFileStream,path2GCode,inputFormat,settingLines,parameters,overrides)
+        if not skipInput:
+            input("Press enter to exit.")
+        return
+    overwrite=True
+    path2Output=path2GCode
+    if parameters.get("Path2Output"):
+        path2Output=parameters.get("Path2Output")
+        overwrite=False
+    outputFormat=parameters.get("OutputFormat","auto")
+    if outputFormat=="auto":
+        outputFormat=inputFormat
+    #pipeline: the reader thread splits the file into layers, the layers are processed here and handed to the writer thread.
+    queueSize=parameters.get("PipelineQueueSize",16)
+    writer=LayerWriter(path2Output,outputFormat,gCodeFileStream,queueSize,keepModeOf=path2GCode if overwrite else None)
+    reader=LayerReader(gCodeFileStream,queueSize)
+    result={}
+    try:
+        for lines in processLayers(reader,settingLines,parameters,result):
+            writer.put(lines)
+        gCodeFileStream.close()
+    except BaseException:
+        writer.abort()
+        raise
+    if result.get("modified"):
+        if overwrite:
+            log("overwriting file")
+        else: 
+            log("write to",path2Output)    
+        writer.close(result.get("rewriteProgress"))   
+    else:
+        writer.abort()
+        log(f"Analysed {result.get('layers')} Layers, but no matching overhangs found->no arcs generated. If unexpected: look if restricting settings like 'minArea' or 'MinBridgeLength' are correct.")     
+    #os.startfile(path2GCode, 'open')
+    parameters.get("RunSummary").report()
+    log("Script execution complete.")
+    if not skipInput:
+        input("Press enter to exit.")
+
+def process(source,overrides:dict=None,summary:dict=None):
+    """
+    Library entry point for gcode held in memory, nothing is printed and no file is touched.
+    source: the text lines, the bytes of a plain, gzip or binary gcode file, or a binary file object.
+    Yields the modified file as chunks of bytes, in the format of the source unless 'OutputFormat' is overridden. A file without overhangs is returned unmodified.
+    The messages go to the 'arc_overhang' logger. If given, the summary dict is filled when the iterator is exhausted, see processLayers().
+    """
+    gCodeFileStream,inputFormat,settingLines=openGCodeSource(source)
+    recorder=WarningRecorder()
+    logger.addHandler(recorder)
+    try:
+        parameters=makeParameters(settingLines,overrides)
+        outputFormat=parameters.get("OutputFormat","auto")
+        if outputFormat=="auto":
+            outputFormat=inputFormat
+        sink=ChunkSink()
+        writer=openGCodeWriter("",outputFormat,gCodeFileStream,fileobj=sink)
+        result={} if summary is None else summary
+        heldLayers=[]# with CorrectPrintTime the first bytes depend on the total print time, known after the last layer
+        for lines in processLayers(splitGCodeIntoLayers(gCodeFileStream),settingLines,parameters,result):
+            if parameters.get("CorrectPrintTime"):
+                heldLayers.append(lines)
+                continue
+            writer.writelines(lines)
+            chunk=sink.drain()
+            if chunk:
+                yield chunk
+        rewrite=result.pop("rewriteProgress",None)
+        if rewrite is not None:
+            heldLayers=rewrite(itertools.chain.from_iterable(heldLayers))
+        for lines in heldLayers:
+            writer.writelines(lines)
+            chunk=sink.drain()
+            if chunk:
+                yield chunk
+        writer.close()
+        chunk=sink.drain()
+        if chunk:
+            yield chunk
+        result.update(parameters.get("RunSummary").asDict())
+        result["inputFormat"]=inputFormat
+        result["outputFormat"]=outputFormat
+    finally:
+        logger.removeHandler(recorder)
+        if summary is not None:
+            summary["warnings"]=recorder.messages
+        if hasattr(gCodeFileStream,"close"):
+            gCodeFileStream.close()
+
+def detectOverhangPolys(layer,prevLayer,parameters:dict)->list:
+    """Find the bridge infill polys of the layer that shall be replaced by arcs (layer.validpolys). Returns their start geometries on the prev layer."""
+    layer.extract_features()
+    layer.spotBridgeInfill()
+    layer.makePolysFromBridgeInfill(extend=parameters.get("ExtendIntoPerimeter",1))
+    layer.polys=layer.mergePolys()
+    layer.verifyinfillpolys()    
+    if not layer.validpolys:
+        return []
+    #make Startpoint form previous layer    
+    return prevLayer.makeStartLineStrings(layer.validpolys,parameters)
+
+def makeParameters(settingLines:list,overrides:dict=None)->dict:
+    """Slicer settings, script parameters and overrides in one dict. Raises ValueError for incompatible slicer settings."""
+    gCodeSettingDict=readSettingsFromGCode2dict(settingLines,{"Fallback_nozzle_diameter":0.4,"Fallback_filament_diameter":1.75}) #ADD FALLBACK VALUES HERE
     parameters=makeFullSettingDict(gCodeSettingDict)
+    if overrides:
+        parameters.update(overrides)
+    parameters["RunSummary"]=RunSummary()
     if not checkforNecesarrySettings(gCodeSettingDict):
-        warnings.warn("Incompatible PursaSlicer-Settings used!")
-        input("Can not run script, gcode unmodified. Press enter to close.")
+        logger.warning("Incompatible PursaSlicer-Settings used!")
         raise ValueError("Incompatible Settings used!") 
+    return parameters
+
+def processLayers(layerSource,settingLines:list,parameters:dict,result:dict=None,detection:dict=None):
+    '''
+    Here all the work is done, therefore it is much to long.
+    Takes the lines of one layer after another, yields the lines of the finished layers in the same order.
+    result is filled with 'modified' (were arcs or special cooling added), 'layers' (number of layers) and 'overhangLayers' (layer numbers with arcs).
+    With CorrectPrintTime and a modified file result also gets 'rewriteProgress': the layers are yielded with the slicer's progress lines, this generator function takes all the
+    written lines again and yields them layer by layer with the corrected M73 lines and footer (PrintTimeEstimator.rewriteProgress()).
+    detection: the result of detectOverhangs() to skip the overhang detection.
+    '''
+    timeEstimator=PrintTimeEstimator(settingLines,parameters) if parameters.get("CorrectPrintTime") else None
     layerobjs=[]
+    overhangLayers=[]
+    solidFillCache=SolidFillCache(parameters.get("SolidFillCacheSize",0),parameters.get("RunSummary"))
+    coolingRegions=[]# [maxZ,polys] of the overhangs, applied to the following layers
+    fileDeadline=time.perf_counter()+parameters.get("TimeBudgetPerFile") if parameters.get("TimeBudgetPerFile") else None
     gcodeWasModified=False
-    if gCodeFileStream:
-        layers=splitGCodeIntoLayers(gCodeLines)
-        gCodeFileStream.close()
-        print("layers:",len(layers))
+    try:
         lastfansetting=0 # initialize variable
-        for idl,layerlines in enumerate(layers):
+        for idl,layerlines in enumerate(layerSource):
             layer=Layer(layerlines,parameters,idl)
             layer.addZ()
             layer.addHeight()
             lastfansetting=layer.spotFanSetting(lastfansetting)
             layerobjs.append(layer)   
-        for idl,layer in enumerate(layerobjs):
+            #special cooling settings for the follow up layers of an overhang
+            for region in coolingRegions:
+                layer.oldpolys.extend(region[1])
+            coolingRegions=[region for region in coolingRegions if layer.z<=region[0]]
             modify=False 
+            arcOverhangGCode=[]# stays empty if no polygon got arcs, e.g. all budgets exhausted
             if idl<1:
+                if timeEstimator:
+                    timeEstimator.addLayer(layer.lines)
+                yield layer.lines
                 continue # no overhangs in the first layer and dont mess with the setup
             else:
-                layer.extract_features()
-                layer.spotBridgeInfill()
-                layer.makePolysFromBridgeInfill(extend=parameters.get("ExtendIntoPerimeter",1))
-                layer.polys=layer.mergePolys()
-                layer.verifyinfillpolys()    
+                if detection is None:
+                    startGeometries=detectOverhangPolys(layer,layerobjs[idl-1],parameters)
+                else:
+                    layer.extract_features()
+                    layer.validpolys,startGeometries=detection.get(idl,([],[]))
+                    layer.polys=layer.validpolys
 
                 #ARC GENERATION
                 if layer.validpolys:
                     modify=True
                     gcodeWasModified=True
-                    print(f"overhang found layer {idl}:",len(layer.polys), f"Z: {layer.z:.2f}")
+                    overhangLayers.append(idl)
+                    log(f"overhang found layer {idl}:",len(layer.polys), f"Z: {layer.z:.2f}")
                     #set special cooling settings for the follow up layers
-                    maxZ=layer.z+parameters.get("specialCoolingZdist")
-                    idoffset=1
-                    currZ=layer.z
-                    while currZ<=maxZ and idl+idoffset<=len(layerobjs)-1:
-                        currZ=layerobjs[idl+idoffset].z
-                        layerobjs[idl+idoffset].oldpolys.extend(layer.validpolys)
-                        idoffset+=1
-
-                    #make Startpoint form previous layer    
-                    prevLayer=layerobjs[idl-1]
-                    prevLayer.makeExternalPerimeter2Polys()
-                    arcOverhangGCode=[]  
-                    for poly in layer.validpolys:
-                        #make parameters more readable
-                        MaxDistanceFromPerimeter=parameters.get("MaxDistanceFromPerimeter") # how much 'bumpiness' you accept in the outline. Lower will generate more small arcs to follow the perimeter better (corners!). Good practice: 2 perimeters+ threshold of 2width=minimal exact touching (if rMin satisfied)
-                        rMax=parameters.get("RMax",15)
-                        pointsPerCircle=parameters.get("PointsPerCircle",80)
-                        arcWidth=parameters.get("ArcWidth")
-                        rMin=parameters.get("ArcCenterOffset")+arcWidth/1.5
-                        rMinStart=parameters.get("nozzle_diameter")
-                        #initialize
-                        finalarcs=[]
-                        arcs=[]
-                        arcs4gcode=[]
-                        #find StartPoint and StartLineString
-                        startLineString,boundaryWithOutStartLine=prevLayer.makeStartLineString(poly,parameters)
+                    coolingRegions.append([layer.z+parameters.get("specialCoolingZdist"),layer.validpolys])
+
+                    keepBridgeInfillPolys=[]
+                    shapeCache={} # shape key -> [(offset,poly,startLineString,arcs,remain2FillPercent,exhausted)], only within the layer
+                    for idp,(poly,(startLineString,boundaryWithOutStartLine)) in enumerate(zip(layer.validpolys,startGeometries)):
                         if startLineString is None:
-                            warnings.warn("Skipping Polygon because no StartLine Found")
+                            logger.warning("Skipping Polygon because no StartLine Found")
                             continue
-                        startpt=getStartPtOnLS(startLineString,parameters)
-                        remainingSpace=poly
-                        #plot_geometry(thresholdedpoly)
-                        #plot_geometry(startLineString,'m')
-                        #plot_geometry(startpt,'r')
-                        #plt.axis('square')
-                        #plt.show()
-                        #first step in Arc Generation
-                        
-                        concentricArcs=generateMultipleConcentricArcs(startpt,rMinStart,rMax,boundaryWithOutStartLine,remainingSpace,parameters)
-                        #print(f"number of concentric arcs generated:",len(concentricArcs))
-                        if len(concentricArcs)<parameters.get("MinStartArcs"): 
-                            #possibly bad chosen startpt, errorhandling:
-                            startpt=getStartPtOnLS(redistribute_vertices(startLineString,0.1),parameters)
-                            concentricArcs=generateMultipleConcentricArcs(startpt,rMinStart,rMax,boundaryWithOutStartLine,remainingSpace,parameters)
-                            if len(concentricArcs)<parameters.get("MinStartArcs"):#still insuff start: try random
-                                print(f"Layer {idl}: Using random Startpoint")
-                                for idr in range(10):
-                                    startpt=getStartPtOnLS(startLineString,parameters,choseRandom=True)
-                                    concentricArcs=generateMultipleConcentricArcs(startpt,rMinStart,rMax,boundaryWithOutStartLine,remainingSpace,parameters)
-                                    if len(concentricArcs)>=parameters.get("MinStartArcs"):
-                                        break
-                                if len(concentricArcs)<parameters.get("MinStartArcs"):    
-                                    for idr in range(10):
-                                        startpt=getStartPtOnLS(redistribute_vertices(startLineString,0.1),parameters,choseRandom=True)
-                                        concentricArcs=generateMultipleConcentricArcs(startpt,rMinStart,rMax,boundaryWithOutStartLine,remainingSpace,parameters)    
-                                        if len(concentricArcs)>=parameters.get("MinStartArcs"):
-                                            break              
-                                if len(concentricArcs)<parameters.get("MinStartArcs"):        
-                                    warnings.warn("Initialization Error: no concentric Arc could be generated at startpoints, moving on")
-                                    continue
-                        arcBoundarys=getArcBoundarys(concentricArcs)
-                        finalarcs.append(concentricArcs[-1]) 
-                        for arc in concentricArcs: 
-                            remainingSpace=remainingSpace.difference(arc.poly.buffer(1e-2))
-                            arcs.append(arc)
-                        for arcboundary in arcBoundarys:    
-                            arcs4gcode.append(arcboundary)
-  
-                        #start bfs (breadth first search algorithm) to fill the remainingspace
-                        idx=0
-                        safetyBreak=0
-                        triedFixing=False
-                        while idx<len(finalarcs):
-                            sys.stdout.write("\033[F") #back to previous line 
-                            sys.stdout.write("\033[K") #clear line 
-                            print("while executed:",idx, len(finalarcs))#\r=Cursor at linestart
-                            curArc=finalarcs[idx]
-                            if curArc.poly.geom_type=="MultiPolygon":
-                                farthestPointOnArc,longestDistance,NearestPointOnPoly=get_farthest_point(curArc.poly.geoms[0],poly,remainingSpace)
-                            else:
-                                farthestPointOnArc,longestDistance,NearestPointOnPoly=get_farthest_point(curArc.poly,poly,remainingSpace)
-                            if not farthestPointOnArc or longestDistance<MaxDistanceFromPerimeter:#no more pts on arc
-                                idx+=1 #go to next arc
-                                continue
-                            startpt=move_toward_point(farthestPointOnArc,curArc.center,parameters.get("ArcCenterOffset",2))
-                            concentricArcs=generateMultipleConcentricArcs(startpt,rMin,rMax,poly.boundary,remainingSpace,parameters)
-                            arcBoundarys=getArcBoundarys(concentricArcs)
-                            #print(f"number of concentric arcs generated:",len(concentricArcs))
-                            if len(concentricArcs)>0:
-                                for arc in concentricArcs: 
-                                    remainingSpace=remainingSpace.difference(arc.poly.buffer(1e-2))
-                                    arcs.append(arc)
-                                finalarcs.append(concentricArcs[-1])
-                                for arcboundary in arcBoundarys:    
-                                    arcs4gcode.append(arcboundary)
-                            else:
-                                idx+=1 # no possible concentric arcs found= arc complete, proceed to next
-                            safetyBreak+=1
-                            if safetyBreak>parameters.get("SafetyBreak_MaxArcNumber",2000):
-                                break
-                            if parameters.get("plotArcsEachStep"):
-                                plt.title(f"Iteration {idx}, Total No Start Points: {len(finalarcs)}, Total No Arcs: {len(arcs)}")
-                                plot_geometry(startLineString,'r')
-                                plot_geometry([arc.poly for arc in arcs],changecolor=True)
-                                plot_geometry(remainingSpace,'g',filled=True)
-                                plot_geometry(startpt,"r")
-                                plt.axis('square')
-                                plt.show()
-                                
-                            if len(finalarcs)==1 and idx==1 and remainingSpace.area/poly.area*100>50 and not triedFixing:
-                                #error handling: the arc-generation got stuck at a thight spot during startup. Automated fix:
-                                parameters["ArcCenterOffset"]=0
-                                rMin=arcWidth/1.5
-                                idx=0
-                                triedFixing=True
-                                print("the arc-generation got stuck at a thight spot during startup. Used Automated fix:set ArcCenterOffset to 0")
-                            if triedFixing and len(finalarcs)==1 and idx==1:
-                                print("fix did not work.")    
+                        duplicate=None
+                        if parameters.get("ReuseDuplicatedOverhangs"):
+                            shapeKey,lookupKeys,offset=getShapeKeys(poly,parameters.get("DuplicateTolerance"))
+                            duplicate=findDuplicate([entry for key in lookupKeys for entry in shapeCache.get(key,[])],poly,startLineString,offset,parameters.get("DuplicateTolerance"))
+                        if duplicate is not None:
+                            cachedOffset,_,_,cachedArcs,remain2FillPercent,exhausted=duplicate
+                            arcs4gcode=translateArcs(cachedArcs,offset-cachedOffset) if cachedArcs is not None else None
+                            parameters.get("RunSummary").count("Overhang area [mm^2]",poly.area)
+                            parameters.get("RunSummary").count("Overhangs reused from duplicates")
+                        else:
+                            parameters["TimeBudget"]=makeTimeBudget(parameters,fileDeadline)
+                            t=time.perf_counter()
+                            arcs4gcode,remain2FillPercent=generateArcsInPoly(poly,startLineString,boundaryWithOutStartLine,parameters,idl)
+                            parameters.get("RunSummary").addTime("Arc generation",time.perf_counter()-t)
+                            parameters.get("RunSummary").count("Overhang area [mm^2]",poly.area)
+                            budget=parameters.pop("TimeBudget")
+                            if budget.stage>0:
+                                log(f"Layer {idl}: overhang {idp} ({poly.area:.0f}mm^2) degraded: {budget.describe()}")
+                                parameters.get("RunSummary").count(f"Overhangs degraded: {budget.stages[budget.stage]}")
+                            exhausted=budget.isExhausted()
+                            if parameters.get("ReuseDuplicatedOverhangs"):
+                                shapeCache.setdefault(shapeKey,[]).append((offset,poly,startLineString,arcs4gcode,remain2FillPercent,exhausted))
+                        if exhausted:
+                            keepBridgeInfillPolys.append(poly)
+                            continue
+                        if not arcs4gcode:
+                            continue
+                        parameters.get("RunSummary").count("Arc filled area [mm^2]",poly.area*(100-remain2FillPercent)/100)
+                        parameters.get("RunSummary").count("Arcs",len(arcs4gcode))
                         #poly finished
-                        remain2FillPercent=remainingSpace.area/poly.area*100
                         if  remain2FillPercent> 100-parameters.get("WarnBelowThisFillingPercentage"):
-                            warnings.warn(f"layer {idl}: The Overhang Area is only {100-remain2FillPercent:.0f}% filled with Arcs. Please try again with adapted Parameters: set 'ExtendIntoPerimeter' higher to enlargen small areas. lower the MaxDistanceFromPerimeter to follow the curvature more precise. Set 'ArcCenterOffset' to 0 to reach delicate areas. ")                 
-                        if parameters.get("plotArcsFinal"):
-                            plt.title(f"Iteration {idx}, Total No Start Points: {len(finalarcs)}, Total No Arcs: {len(arcs)}")
-                            plot_geometry(startLineString,'r')
-                            plot_geometry([arc.poly for arc in arcs],changecolor=True)
-                            plot_geometry(remainingSpace,'g',filled=True)
-                            plot_geometry(startpt,"r")
-                            plt.axis('square')
-                            plt.show()  
+                            logger.warning(f"layer {idl}: The Overhang Area is only {100-remain2FillPercent:.0f}% filled with Arcs. Please try again with adapted Parameters: set 'ExtendIntoPerimeter' higher to enlargen small areas. lower the MaxDistanceFromPerimeter to follow the curvature more precise. Set 'ArcCenterOffset' to 0 to reach delicate areas. ")                 
+                        if parameters.get("OptimizeTravel"):
+                            arcs4gcode=orderArcs4GCode(arcs4gcode,parameters)
                         #generate gcode for arc and insert at the beginning of the layer
                         eStepsPerMM=calcEStepsPerMM(parameters)
                         arcOverhangGCode.append(f"M106 S{np.round(parameters.get('bridge_fan_speed',100)*2.55)}\n")#turn cooling Fan on at Bridge Setting
@@ -277,8 +385,8 @@ def main(gCodeFileStream,path2GCode,skipInput)->None:
                         #plt.axis('square')
                         #plt.show()
                         for ida,arc in enumerate(arcs4gcode):
-                            if not arc.is_empty:    
-                                arcGCode=arc2GCode(arcline=arc,eStepsPerMM=eStepsPerMM,arcidx=ida,kwargs=parameters)
+                            if len(arc.arcline)>0:    
+                                arcGCode=arc2GCode(arcline=arc.arcline,eStepsPerMM=eStepsPerMM,arcidx=ida,kwargs=parameters,center=arc.center,r=arc.r)
                                 arcOverhangGCode.append(arcGCode)
                                 if parameters.get("TimeLapseEveryNArcs")>0:
                                     if ida%parameters.get("TimeLapseEveryNArcs"):
@@ -287,13 +395,24 @@ def main(gCodeFileStream,path2GCode,skipInput)->None:
                 #apply special cooling settings:    
                 if len(layer.oldpolys)>0:
                     modify=True
-                    print("oldpolys found in layer:",idl)
+                    log("oldpolys found in layer:",idl)
                     layer.spotSolidInfill()
-                    layer.makePolysFromSolidInfill(extend=parameters.get("ExtendIntoPerimeter"))
-                    layer.solidPolys=layer.mergePolys(layer.solidPolys)
+                    solidKey=getGeometryFingerprint(layer.sinfills,parameters.get("ExtendIntoPerimeter")) if layer.sinfills else None# without solid infill mergePolys() falls back to the bridge infill polys
+                    solidPolys=solidFillCache.get("Solid infill polys",solidKey) if solidKey else None
+                    if solidPolys is None:
+                        layer.makePolysFromSolidInfill(extend=parameters.get("ExtendIntoPerimeter"))
+                        solidPolys=layer.mergePolys(layer.solidPolys)
+                        if solidKey:
+                            solidFillCache.put(solidKey,solidPolys)
+                    layer.solidPolys=list(solidPolys)
                     allhilbertpts=[]
                     for poly in layer.solidPolys:
-                        hilbertpts=layer.createHilbertCurveInPoly(poly)
+                        hilbertKey=getGeometryFingerprint([poly],idl%2,parameters.get("solid_infill_extrusion_width"),parameters.get("HilbertFillingPercentage"),
+                                                          parameters.get("aboveArcsInfillPrintSpeed"),parameters.get("HilbertTravelEveryNSeconds"))# everything createHilbertCurveInPoly() depends on
+                        hilbertpts=solidFillCache.get("Hilbert",hilbertKey)
+                        if hilbertpts is None:
+                            hilbertpts=layer.createHilbertCurveInPoly(poly)
+                            solidFillCache.put(hilbertKey,hilbertpts)
                         allhilbertpts.extend(hilbertpts)
                         if parameters.get("plotEachHilbert"):
                             plot_geometry(hilbertpts,changecolor=True)
@@ -301,6 +420,7 @@ def main(gCodeFileStream,path2GCode,skipInput)->None:
                             plt.title("Debug")
                             plt.axis('square')
                             plt.show()
+                    allhilbertpts=orderHilbertChunks(allhilbertpts,parameters)
                 if modify:
                     modifiedlayer=Layer([],parameters,idl) # copy the other infos if needed: future to do
                     isInjected=False
@@ -308,14 +428,18 @@ def main(gCodeFileStream,path2GCode,skipInput)->None:
                     curPrintSpeed="G1 F600"
                     messedWithSpeed=False
                     messedWithFan=False
-                    layer.prepareDeletion(featurename="Bridge",polys=layer.validpolys)
+                    if layer.validpolys:
+                        replacedPolys=[poly for poly in layer.validpolys if not any(poly is kept for kept in keepBridgeInfillPolys)]
+                        if replacedPolys:
+                            layer.prepareDeletion(featurename="Bridge",polys=replacedPolys)
                     if len(layer.oldpolys)>0:
-                        layer.prepareDeletion(featurename=":Solid",polys=layer.oldpolys)
-                    #print("FEATURES:",[(f[0],f[2]) for f in layer.features])
+                        layer.prepareDeletion(featurename=":Solid")
+                    #log("FEATURES:",[(f[0],f[2]) for f in layer.features])
                     injectionStart=None
-                    print("modifying GCode")
+                    closeToBridging=layer.spotLinesClose2Bridging(parameters.get("CoolingSettingDetectionDistance"))
+                    log("modifying GCode")
                     for idline,line in enumerate(layer.lines):
-                        if layer.validpolys:
+                        if arcOverhangGCode:
                             if ";TYPE" in line and not isInjected:#inject arcs at the very start
                                 injectionStart=idline
                                 modifiedlayer.lines.append(";TYPE:Arc infill\n")
@@ -346,7 +470,7 @@ def main(gCodeFileStream,path2GCode,skipInput)->None:
                         if "G1 F" in line.split(";")[0]:#special block-speed-command
                             curPrintSpeed=line    
                         if layer.exportThisLine(idline):
-                            if layer.isClose2Bridging(line,parameters.get("CoolingSettingDetectionDistance")):
+                            if closeToBridging[idline]:
                                 if not messedWithFan:
                                     modifiedlayer.lines.append(f"M106 S{parameters.get('aboveArcsFanSpeed')}\n")
                                     messedWithFan=True
@@ -364,38 +488,779 @@ def main(gCodeFileStream,path2GCode,skipInput)->None:
                     if messedWithFan:
                         modifiedlayer.lines.append(f"M106 S{layer.fansetting:.0f}\n")
                         messedWithFan=False        
+                    if timeEstimator:
+                        modifiedlayer.lines="".join(modifiedlayer.lines).splitlines(keepends=True)# the arc gcode was added char by char
+                        timeEstimator.addModifiedLayer(idl,layer.lines,modifiedlayer.lines,layerobjs[idl-1].lines)
                     layerobjs[idl]=modifiedlayer  # overwrite the infos
-    if gcodeWasModified:
-        overwrite=True
-        if parameters.get("Path2Output"):
-            path2GCode=parameters.get("Path2Output")
-            overwrite=False
-        f=open(path2GCode,"w")
-        if overwrite:
-            print("overwriting file")
-        else: 
-            print("write to",path2GCode)    
-        for layer in layerobjs:
-            f.writelines(layer.lines)
-        f.close()   
+                layerobjs[idl-1].releaseGeometry()# the start geometry of the prev layer is not needed anymore
+                if timeEstimator:
+                    timeEstimator.addLayer(layerobjs[idl].lines)
+                yield layerobjs[idl].lines
+                if idl>1:
+                    layerobjs[idl-2].lines=[]# written, only the layer above needs the lines of its prev layer
+        log("layers:",len(layerobjs))
+        if timeEstimator and gcodeWasModified and result is not None:
+            result["rewriteProgress"]=timeEstimator.rewriteProgress # every M73 line and the footer depend on the corrected total print time, known only now
+    finally:
+        if result is not None:
+            result.update({"modified":gcodeWasModified,"layers":len(layerobjs),"overhangLayers":overhangLayers})
+
+################################# HELPER FUNCTIONS GCode I/O #################################
+##############################################################################################
+# Plain text, gzip compressed and PrusaSlicer binary gcode (bgcode) are supported, detected by the file magic.
+# All readers are iterables of text lines, all writers have writelines() and close(), so the layer pipeline does not care about the format.
+
+GZIP_MAGIC=b"\x1f\x8b"
+BGCODE_MAGIC=b"GCDE"
+BGCODE_BLOCK_FILE_METADATA=0
+BGCODE_BLOCK_GCODE=1
+BGCODE_BLOCK_SLICER_METADATA=2
+BGCODE_BLOCK_THUMBNAIL=5
+BGCODE_COMPRESSION_NONE=0
+BGCODE_COMPRESSION_DEFLATE=1
+BGCODE_COMPRESSION_HEATSHRINK_11_4=2
+BGCODE_COMPRESSION_HEATSHRINK_12_4=3
+BGCODE_MAX_BLOCK_SIZE=65535
+
+def detectGCodeFormat(filepath:str)->str:
+    """Returns 'gzip', 'bgcode' or 'gcode' (plain text), based on the first bytes of the file."""
+    with open(filepath,"rb") as f:
+        magic=f.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return "gzip"
+    if magic==BGCODE_MAGIC:
+        return "bgcode"
+    return "gcode"
+
+def openGCode(filepath:str):
+    """Open a gcode file of any supported format for reading. The content is decompressed on the fly while iterating over the lines."""
+    gCodeFormat=detectGCodeFormat(filepath)
+    if gCodeFormat=="gzip":
+        return gzip.open(filepath,"rt")
+    if gCodeFormat=="bgcode":
+        return BGCodeReader(filepath)
+    return open(filepath,"r")
+
+def openGCodeWriter(filepath:str,gCodeFormat:str,source=None,fileobj=None):
+    """
+    Open a gcode file for writing in the given format. Binary gcode takes the file header and metadata blocks from the source BGCodeReader.
+    With fileobj the data goes into that binary file object instead, filepath is then only used as name in the gzip header.
+    """
+    if gCodeFormat=="gzip":
+        if fileobj is not None:
+            return io.TextIOWrapper(gzip.GzipFile(filepath,"wb",fileobj=fileobj))
+        return gzip.open(filepath,"wt")
+    if gCodeFormat=="bgcode":
+        if isinstance(source,BGCodeReader):
+            return BGCodeWriter(filepath,source,fileobj=fileobj)
+        logger.warning("Binary gcode output needs a binary gcode input for the metadata, writing plain text gcode instead.")
+    if fileobj is not None:
+        return io.TextIOWrapper(fileobj)
+    return open(filepath,"w")
+
+def heatshrinkDecode(data:bytes,windowBits:int,lookaheadBits:int)->bytes:
+    """Decompress heatshrink (LZSS) data: 1 bit tag, then a literal byte or a backreference (offset-1,count-1)."""
+    out=bytearray()
+    data=bytes(data)+b"\x00\x00\x00"
+    totalBits=(len(data)-3)*8
+    pos=0
+    while True:
+        if pos+1>totalBits:
+            break
+        isLiteral=(data[pos>>3]>>(7-(pos&7)))&1
+        pos+=1
+        if isLiteral:
+            if pos+8>totalBits:
+                break
+            val=int.from_bytes(data[pos>>3:(pos>>3)+3],"big")
+            out.append((val>>(16-(pos&7)))&0xFF)
+            pos+=8
+        else:
+            if pos+windowBits+lookaheadBits>totalBits:
+                break
+            val=int.from_bytes(data[pos>>3:(pos>>3)+3],"big")
+            offset=((val>>(24-(pos&7)-windowBits))&((1<<windowBits)-1))+1
+            pos+=windowBits
+            val=int.from_bytes(data[pos>>3:(pos>>3)+3],"big")
+            count=((val>>(24-(pos&7)-lookaheadBits))&((1<<lookaheadBits)-1))+1
+            pos+=lookaheadBits
+            if offset>=count and offset<=len(out):
+                out+=out[len(out)-offset:len(out)-offset+count]
+            else:
+                for _ in range(count):
+                    out.append(out[-offset] if offset<=len(out) else 0)# the window of the decoder starts zero filled
+    return bytes(out)
+
+def heatshrinkEncode(data:bytes,windowBits:int,lookaheadBits:int)->bytes:
+    """Compress data with heatshrink (LZSS), greedy longest match in the window. A backreference is used from 2 bytes on, since it is shorter than two literals."""
+    out=bytearray()
+    acc=0
+    nbits=0
+    maxCount=1<<lookaheadBits
+    window=1<<windowBits
+    backrefBits=1+windowBits+lookaheadBits
+    n=len(data)
+    pos=0
+    while pos<n:
+        lo=max(0,pos-window)
+        best=0
+        bestStart=-1
+        k=2
+        while k<=maxCount and pos+k<=n:
+            s=data.rfind(data[pos:pos+k],lo,pos+k-1)
+            if s<0:
+                break
+            k+=1
+            while k<=maxCount and pos+k<=n and data[s+k-1]==data[pos+k-1]:
+                k+=1
+            best=k-1
+            bestStart=s
+        if best>=2:
+            acc=(acc<<backrefBits)|((pos-bestStart-1)<<lookaheadBits)|(best-1)
+            nbits+=backrefBits
+            pos+=best
+        else:
+            acc=(acc<<9)|0x100|data[pos]
+            nbits+=9
+            pos+=1
+        while nbits>=8:
+            nbits-=8
+            out.append((acc>>nbits)&0xFF)
+        acc&=(1<<nbits)-1
+    if nbits:
+        out.append((acc<<(8-nbits))&0xFF)
+    return bytes(out)
+
+def meatpackDecode(data:bytes)->bytes:
+    """
+    Undo the MeatPack encoding of binary gcode: two common characters packed into one byte, 0b1111 marks a full width character that follows.
+    In the no spaces mode the spaces of G lines are removed and are inserted again before the parameters.
+    """
+    table=b"0123456789. \nGX"
+    signalByte=0xFF
+    unpacking=False
+    noSpaces=False
+    signalCount=0
+    fullCharQueue=0
+    charBuffer=None
+    out=bytearray()
+    isGLine=False
+    isComment=False
+    lineStart=True
+    def emit(c:int)->None:
+        nonlocal isGLine,isComment,lineStart
+        if lineStart:
+            isGLine=c==ord("G")
+            isComment=False
+            lineStart=False
+        elif c==ord(";"):
+            isComment=True
+        elif noSpaces and isGLine and not isComment and c in b"XYZEFIJRPWHCA" and out[-1]!=ord(" "):
+            out.append(ord(" "))
+        out.append(c)
+        if c==ord("\n"):
+            lineStart=True
+    def unpackedChar(nibble:int)->int:
+        if nibble==0b1011 and noSpaces:
+            return ord("E")
+        return table[nibble]
+    def handleChar(c:int)->None:
+        nonlocal fullCharQueue,charBuffer
+        if not unpacking:
+            emit(c)
+        elif fullCharQueue>0:
+            emit(c)
+            if charBuffer is not None:
+                emit(charBuffer)
+                charBuffer=None
+            fullCharQueue-=1
+        else:
+            first=c&0xF
+            second=c>>4
+            if first==0xF:
+                fullCharQueue+=1
+                if second==0xF:
+                    fullCharQueue+=1
+                else:
+                    charBuffer=unpackedChar(second)
+            else:
+                emit(unpackedChar(first))
+                if unpackedChar(first)!=ord("\n"):
+                    if second==0xF:
+                        fullCharQueue+=1
+                    else:
+                        emit(unpackedChar(second))
+    commandActive=False
+    for c in data:
+        if c==signalByte:
+            if signalCount>0:
+                commandActive=True
+                signalCount=0
+            else:
+                signalCount+=1
+        elif commandActive:
+            if c==0xFB:
+                unpacking=True
+            elif c in (0xFA,0xF9):
+                unpacking=False
+            elif c==0xF7:
+                noSpaces=True
+            elif c==0xF6:
+                noSpaces=False
+            commandActive=False
+        else:
+            if signalCount>0:
+                handleChar(signalByte)
+                signalCount=0
+            handleChar(c)
+    return bytes(out)
+
+def decompressBGCodeBlock(payload:bytes,compression:int)->bytes:
+    if compression==BGCODE_COMPRESSION_NONE:
+        return payload
+    if compression==BGCODE_COMPRESSION_DEFLATE:
+        return zlib.decompress(payload)
+    if compression==BGCODE_COMPRESSION_HEATSHRINK_11_4:
+        return heatshrinkDecode(payload,11,4)
+    if compression==BGCODE_COMPRESSION_HEATSHRINK_12_4:
+        return heatshrinkDecode(payload,12,4)
+    raise ValueError(f"Unknown bgcode block compression: {compression}")
+
+def makeBGCodeBlock(blockType:int,data:bytes,params:bytes,compression:int,checksumType:int)->bytes:
+    if compression==BGCODE_COMPRESSION_DEFLATE:
+        payload=zlib.compress(data)
+    elif compression==BGCODE_COMPRESSION_HEATSHRINK_11_4:
+        payload=heatshrinkEncode(data,11,4)
+    elif compression==BGCODE_COMPRESSION_HEATSHRINK_12_4:
+        payload=heatshrinkEncode(data,12,4)
     else:
-        print(f"Analysed {len(layerobjs)} Layers, but no matching overhangs found->no arcs generated. If unexpected: look if restricting settings like 'minArea' or 'MinBridgeLength' are correct.")     
-    #os.startfile(path2GCode, 'open')
-    print("Script execution complete.")
-    if not skipInput:
-        input("Press enter to exit.")
+        payload=data
+    block=struct.pack("<HHI",blockType,compression,len(data))
+    if compression!=BGCODE_COMPRESSION_NONE:
+        block+=struct.pack("<I",len(payload))
+    block+=params+payload
+    if checksumType==1:
+        block+=struct.pack("<I",zlib.crc32(block))
+    return block
+
+class BGCodeReader():
+    """
+    Streams the text lines of a PrusaSlicer binary gcode file, one gcode block after another.
+    The metadata blocks in front of the gcode are kept raw for BGCodeWriter, the slicer settings are provided as settingLines in the format of a text gcode.
+    """
+    def __init__(self,filepath:str=None,fileobj=None)->None:
+        self.f=fileobj if fileobj is not None else open(filepath,"rb")
+        self.fileHeader=self.f.read(10)
+        if self.fileHeader[:4]!=BGCODE_MAGIC:
+            raise ValueError(f"{filepath or 'source'} is no binary gcode file")
+        self.version,self.checksumType=struct.unpack("<IH",self.fileHeader[4:])
+        self.metadataBlocks=[]
+        self.settingLines=[]
+        self.gCodeBlock=None
+        for block in self.readBlocks():
+            blockType,compression,params,payload,raw=block
+            if blockType==BGCODE_BLOCK_GCODE:
+                self.gCodeBlock=block
+                break
+            self.metadataBlocks.append(raw)
+            if blockType==BGCODE_BLOCK_SLICER_METADATA:
+                self.settingLines.append("; prusaslicer_config = begin\n")
+                for line in decompressBGCodeBlock(payload,compression).decode().splitlines():
+                    key,sep,value=line.partition("=")# INI encoded: key=value
+                    if sep:
+                        self.settingLines.append(f"; {key.strip()} = {value.strip()}\n")
+                self.settingLines.append("; prusaslicer_config = end\n")
+    def readBlocks(self):
+        """Yields blockType,compression,params,payload,raw bytes of the block."""
+        while True:
+            header=self.f.read(8)
+            if len(header)<8:
+                return
+            blockType,compression,uncompressedSize=struct.unpack("<HHI",header)
+            if compression!=BGCODE_COMPRESSION_NONE:
+                sizeBytes=self.f.read(4)
+                header+=sizeBytes
+                size=struct.unpack("<I",sizeBytes)[0]
+            else:
+                size=uncompressedSize
+            params=self.f.read(6 if blockType==BGCODE_BLOCK_THUMBNAIL else 2)
+            payload=self.f.read(size)
+            raw=header+params+payload
+            if self.checksumType==1:
+                checksum=self.f.read(4)
+                if struct.unpack("<I",checksum)[0]!=zlib.crc32(raw):
+                    raise ValueError("Binary gcode block with wrong checksum, file corrupted?")
+                raw+=checksum
+            yield blockType,compression,params,payload,raw
+    def decodeGCodeBlock(self,block)->str:
+        blockType,compression,params,payload,raw=block
+        data=decompressBGCodeBlock(payload,compression)
+        if struct.unpack("<H",params)[0]!=0:# MeatPack, with or without comments
+            data=meatpackDecode(data)
+        return data.decode()
+    def __iter__(self):
+        rest=""
+        blocks=self.readBlocks()
+        block=self.gCodeBlock
+        while block is not None:
+            if block[0]==BGCODE_BLOCK_GCODE:
+                lines=(rest+self.decodeGCodeBlock(block)).replace("\r\n","\n").splitlines(keepends=True)# same newline handling as open(), a CR at the block end waits in rest for its LF
+                rest=lines.pop() if lines and not lines[-1].endswith("\n") else ""
+                yield from lines
+            block=next(blocks,None)
+        if rest:
+            yield rest
+    def readlines(self)->list:
+        return list(self)
+    def close(self)->None:
+        self.f.close()
+
+class BGCodeWriter():
+    """Writes the text lines as heatshrink compressed gcode blocks behind the file header and metadata blocks of the source file."""
+    def __init__(self,filepath:str,source:BGCodeReader,compression:int=BGCODE_COMPRESSION_HEATSHRINK_12_4,fileobj=None)->None:
+        self.checksumType=source.checksumType
+        self.compression=compression
+        self.f=fileobj if fileobj is not None else open(filepath,"wb")
+        self.f.write(source.fileHeader)
+        for raw in source.metadataBlocks:
+            self.f.write(raw)
+        self.buffer=bytearray()
+    def write(self,text:str)->None:
+        self.buffer+=text.encode()
+        while len(self.buffer)>=BGCODE_MAX_BLOCK_SIZE:
+            cut=self.buffer.rfind(b"\n",0,BGCODE_MAX_BLOCK_SIZE)+1 or BGCODE_MAX_BLOCK_SIZE # blocks end with complete lines
+            self.writeBlock(bytes(self.buffer[:cut]))
+            del self.buffer[:cut]
+    def writelines(self,lines)->None:
+        for line in lines:
+            self.write(line)
+    def writeBlock(self,data:bytes)->None:
+        self.f.write(makeBGCodeBlock(BGCODE_BLOCK_GCODE,data,struct.pack("<H",0),self.compression,self.checksumType))
+    def close(self)->None:
+        if self.buffer:
+            self.writeBlock(bytes(self.buffer))
+            self.buffer=bytearray()
+        self.f.close()
+
+def openGCodeSource(source)->tuple:
+    """
+    In memory counterpart of openGCode() for process(): source are text lines, bytes or a binary file object.
+    Returns the lines (a list, or a BGCodeReader streaming them), the format and the setting lines.
+    """
+    if isinstance(source,(bytes,bytearray,memoryview)):
+        source=io.BytesIO(bytes(source))
+    if not hasattr(source,"read"):
+        lines=[line[:-2]+"\n" if line.endswith("\r\n") else line for line in source]# same newline handling as open()
+        return lines,"gcode",getSettingLines(lines)
+    if not source.seekable():
+        source=io.BytesIO(source.read())
+    start=source.tell()
+    magic=source.read(4)
+    source.seek(start)
+    if magic==BGCODE_MAGIC:
+        reader=BGCodeReader(fileobj=source)
+        return reader,"bgcode",reader.settingLines
+    if magic.startswith(GZIP_MAGIC):
+        lines=io.TextIOWrapper(gzip.GzipFile(fileobj=source)).readlines()
+        return lines,"gzip",getSettingLines(lines)
+    lines=io.TextIOWrapper(io.BytesIO(source.read())).readlines()# same newline handling as open()
+    return lines,"gcode",getSettingLines(lines)
+
+class ChunkSink(io.RawIOBase):
+    """Binary file object that collects what is written, drain() takes it out. Used to yield the output of process() in chunks."""
+    def __init__(self)->None:
+        super().__init__()
+        self.data=bytearray()
+    def writable(self)->bool:
+        return True
+    def write(self,b)->int:
+        self.data+=b
+        return len(b)
+    def drain(self)->bytes:
+        chunk=bytes(self.data)
+        self.data.clear()
+        return chunk
+
+def getSettingLines(lines:list)->list:
+    """The lines from the last '; prusaslicer_config = begin' to the end."""
+    for idx in range(len(lines)-1,-1,-1):
+        if lines[idx].startswith("; prusaslicer_config = begin"):
+            return lines[idx:]
+    return []
+
+def readSettingLines(gCodeFileStream,filepath:str)->list:
+    """
+    The slicer settings, from '; prusaslicer_config = begin' to the end of the file. Binary gcode has them in a metadata block,
+    for plain text only the end of the file is read. Gzip can not be read backwards, the file is decompressed once in advance.
+    """
+    if getattr(gCodeFileStream,"settingLines",None):
+        return gCodeFileStream.settingLines
+    marker=b"; prusaslicer_config = begin"
+    if detectGCodeFormat(filepath)=="gzip":
+        settingLines=[]
+        with gzip.open(filepath,"rt") as f:
+            for line in f:
+                if line.startswith(marker.decode()):
+                    settingLines=[]
+                settingLines.append(line)
+        return settingLines
+    with open(filepath,"rb") as f:
+        f.seek(0,os.SEEK_END)
+        pos=f.tell()
+        tail=b""
+        while pos>0 and tail.rfind(marker)<0:
+            step=min(pos,1<<16)
+            pos-=step
+            f.seek(pos)
+            tail=f.read(step)+tail
+    start=tail.rfind(marker)
+    if start<0:
+        return []
+    return tail[start:].decode().replace("\r\n","\n").splitlines(keepends=True)
+
+class LayerReader():
+    """Splits the gcode into layers in a background thread. Iterating yields the layers in order, at most queueSize layers are read ahead."""
+    def __init__(self,gCodeFileStream,queueSize:int=16)->None:
+        self.queue=queue.Queue(max(queueSize,1))
+        self.error=None
+        self.thread=threading.Thread(target=self.run,args=(gCodeFileStream,),daemon=True)
+        self.thread.start()
+    def run(self,gCodeFileStream)->None:
+        try:
+            for layerlines in splitGCodeIntoLayers(gCodeFileStream):
+                self.queue.put(layerlines)
+        except BaseException as e:
+            self.error=e
+        finally:
+            self.queue.put(None)
+    def __iter__(self):
+        while True:
+            layerlines=self.queue.get()
+            if layerlines is None:
+                break
+            yield layerlines
+        self.thread.join()
+        if self.error:
+            raise self.error
+
+class LayerWriter():
+    """
+    Writes the finished layers in a background thread, in the order they are put. The file is written next to the output as '.part'
+    and only replaces the output on close(), so the input can be overwritten while it is still read.
+    """
+    def __init__(self,filepath:str,gCodeFormat:str,source=None,queueSize:int=16,keepModeOf:str=None)->None:
+        self.filepath=filepath
+        self.tempPath=filepath+".part"
+        self.keepModeOf=keepModeOf
+        self.raw=open(self.tempPath,"wb")
+        self.f=openGCodeWriter(filepath,gCodeFormat,source,fileobj=self.raw)
+        self.queue=queue.Queue(max(queueSize,1))
+        self.error=None
+        self.thread=threading.Thread(target=self.run,daemon=True)
+        self.thread.start()
+    def run(self)->None:
+        while True:
+            lines=self.queue.get()
+            if lines is None:
+                break
+            if self.error:
+                continue # keep draining, the main thread must not block on a full queue
+            try:
+                self.f.writelines(lines)
+            except BaseException as e:
+                self.error=e
+    def put(self,lines:list)->None:
+        self.queue.put(lines)
+    def finish(self)->None:
+        self.queue.put(None)
+        self.thread.join()
+        self.f.close()
+        self.raw.close()
+    def close(self,rewrite=None)->None:
+        """
+        Write the remaining layers and move the file to its destination.
+        rewrite: generator function over the lines of the written file yielding the final layers, applied in a second streaming pass, see processLayers().
+        """
+        self.finish()
+        if self.error:
+            os.remove(self.tempPath)
+            raise self.error
+        if rewrite is not None:
+            self.rewrite(rewrite)
+        if self.keepModeOf and os.path.exists(self.keepModeOf):
+            shutil.copymode(self.keepModeOf,self.tempPath)
+        os.replace(self.tempPath,self.filepath)
+    def rewrite(self,rewrite)->None:
+        """Read the '.part' file back and write the layers of rewrite() to a second temp file, which then replaces it."""
+        rewrittenPath=self.filepath+".rewrite.part"
+        source=openGCode(self.tempPath)
+        try:
+            with open(rewrittenPath,"wb") as raw:
+                f=openGCodeWriter(self.filepath,detectGCodeFormat(self.tempPath),source,fileobj=raw)
+                for lines in rewrite(source):
+                    f.writelines(lines)
+                f.close()
+        except BaseException:
+            if os.path.exists(rewrittenPath):
+                os.remove(rewrittenPath)
+            os.remove(self.tempPath)
+            raise
+        finally:
+            source.close()
+        os.replace(rewrittenPath,self.tempPath)
+    def abort(self)->None:
+        """Discard everything written so far, the output stays untouched."""
+        self.finish()
+        if os.path.exists(self.tempPath):
+            os.remove(self.tempPath)
+
+################################# HELPER FUNCTIONS Print Time #################################
+###############################################################################################
+
+def parseMoves(lines:list)->tuple:
+    """
+    Columnar arrays of the gcode lines, one row per line: kind of move (0: no move, 1: G0/G1, 2: G2, 3: G3), the values of X,Y,Z,E,F,I,J (NaN if not given),
+    the accelerations set by M204 (print, travel, retract; NaN if not set) and dwell times of G4.
+    """
+    n=len(lines)
+    kind=np.zeros(n,dtype=np.int8)
+    cols={key:np.full(n,np.nan) for key in "XYZEFIJ"}
+    accel=np.full((n,3),np.nan)
+    dwell=np.zeros(n)
+    moveKinds={"G0":1,"G1":1,"G2":2,"G3":3}
+    for idl,line in enumerate(lines):
+        words=line.split(";",1)[0].split()
+        if not words:
+            continue
+        cmd=words[0]
+        if cmd in moveKinds:
+            kind[idl]=moveKinds[cmd]
+            for word in words[1:]:
+                if word[0] in cols:
+                    try:
+                        cols[word[0]][idl]=float(word[1:])
+                    except ValueError:
+                        pass
+        elif cmd=="M204":
+            for word in words[1:]:
+                try:
+                    val=float(word[1:])
+                except ValueError:
+                    continue
+                if word[0]=="S":
+                    accel[idl,:2]=val
+                elif word[0] in "PTR":
+                    accel[idl,"PTR".index(word[0])]=val
+        elif cmd=="G4":
+            for word in words[1:]:
+                if word[0]=="P":
+                    dwell[idl]=float(word[1:])/1000
+                elif word[0]=="S":
+                    dwell[idl]=float(word[1:])
+    return kind,cols,accel,dwell
+
+def forwardFill(a:np.ndarray,start)->np.ndarray:
+    """Replace NaN with the last given value along axis 0, start before the first one."""
+    idx=np.where(np.isnan(a),-1,np.arange(len(a)).reshape((-1,)+(1,)*(a.ndim-1)))
+    idx=np.maximum.accumulate(idx,axis=0)
+    filled=np.take_along_axis(a,np.maximum(idx,0),axis=0)
+    return np.where(idx<0,start,filled)
+
+def limitRecurrence(cap:np.ndarray,gain:np.ndarray)->np.ndarray:
+    """w[0]=cap[0], w[i]=min(cap[i],w[i-1]+gain[i-1]) for all i at once: w[i]=S[i]+min(cap[k]-S[k] for k<=i) with the prefix sums S of gain."""
+    S=np.concatenate(([0],np.cumsum(gain)))
+    return S+np.minimum.accumulate(cap-S)
+
+def formatPrintTime(seconds:float)->str:
+    """Same format as PrusaSlicer: 1d 3h 24m 6s, leading zero units are left out."""
+    seconds=int(round(seconds))
+    d,rest=divmod(seconds,86400)
+    h,rest=divmod(rest,3600)
+    m,s=divmod(rest,60)
+    parts=[]
+    for val,unit in ((d,"d"),(h,"h"),(m,"m")):
+        if val or parts:
+            parts.append(f"{val}{unit}")
+    parts.append(f"{s}s")
+    return " ".join(parts)
+
+def parsePrintTime(text:str)->float:
+    seconds=0
+    for part in text.split():
+        seconds+=float(part[:-1])*{"d":86400,"h":3600,"m":60,"s":1}.get(part[-1],0)
+    return seconds
+
+class PrintTimeEstimator():
+    """
+    Trapezoidal acceleration model with the machine limits of the slicer settings (normal and silent mode). Only the difference between the original
+    and the modified layers is estimated, the M73 progress lines and the estimated printing time at the end of the file are shifted by it.
+    """
+    modes=(("normal","P","R"),("silent","Q","S"))
+    def __init__(self,settingLines:list,kwargs:dict={})->None:
+        raw={}
+        for line in settingLines:
+            key,sep,val=line.strip("; \n").partition(" = ")
+            if sep and key.startswith("machine_max_"):
+                raw[key]=[float(v) for v in val.split(",")]
+        def limit(key:str,default:float,mode:int)->float:
+            vals=raw.get(key,[default])
+            return vals[min(mode,len(vals)-1)]
+        self.limits=[]
+        for mode in range(2):
+            self.limits.append({
+                "feedrate":np.array([limit(f"machine_max_feedrate_{ax}",default,mode) for ax,default in zip("xyze",(500,500,12,120))]),
+                "acceleration":np.array([limit(f"machine_max_acceleration_{ax}",default,mode) for ax,default in zip("xyze",(9000,9000,500,10000))]),
+                "jerk":np.array([limit(f"machine_max_jerk_{ax}",default,mode) for ax,default in zip("xyze",(10,10,0.4,2.5))]),
+                "moveAcceleration":np.array([limit(f"machine_max_acceleration_{key}",1500,mode) for key in ("extruding","travel","retracting")]),
+                })
+        self.parameters=kwargs
+        self.layers={}# idl-> per mode: (time of the original layer, time of each line of the modified layer)
+        self.layerLengths=[]# number of lines of each written layer
+        self.totals=[None,None]# per mode: estimated printing time of the footer
+        self.firstRemaining=[None,None]# per mode: remaining time of the first M73 line
+    def getStartState(self,prevLines:list)->list:
+        """Last X,Y,Z,F before the layer."""
+        state=[np.nan]*4
+        for line in reversed(prevLines):
+            words=line.split(";",1)[0].split()
+            if not words or words[0] not in ("G0","G1","G2","G3"):
+                continue
+            for word in words[1:]:
+                if word[0] in "XYZF" and np.isnan(state["XYZF".index(word[0])]):
+                    try:
+                        state["XYZF".index(word[0])]=float(word[1:])
+                    except ValueError:
+                        pass
+            if not np.isnan(state).any():
+                break
+        return [0 if np.isnan(v) else v for v in state[:3]]+[3000 if np.isnan(state[3]) else state[3]]
+    def estimateLineTimes(self,lines:list,startState:list,mode:int=0)->np.ndarray:
+        """Time in seconds spent on each line. The layer starts and ends at standstill."""
+        lim=self.limits[mode]
+        kind,cols,accel,dwell=parseMoves(lines)
+        times=dwell.copy()
+        moves=np.nonzero(kind)[0]
+        if len(moves)==0:
+            return times
+        pos=np.column_stack([forwardFill(cols[key],start) for key,start in zip("XYZ",startState[:3])])
+        prev=np.vstack((startState[:3],pos[:-1]))[moves]
+        pos=pos[moves]
+        feedrate=forwardFill(cols["F"],startState[3])[moves]/60
+        moveAccel=np.minimum(forwardFill(accel,lim["moveAcceleration"])[moves],lim["moveAcceleration"])
+        de=np.nan_to_num(cols["E"][moves])
+        d=pos-prev
+        lengthXY=np.hypot(d[:,0],d[:,1])
+        #arcs: length along the circle
+        isArc=kind[moves]>1
+        if isArc.any():
+            center=prev[isArc,:2]+np.column_stack((np.nan_to_num(cols["I"][moves][isArc]),np.nan_to_num(cols["J"][moves][isArc])))
+            a0=np.arctan2(prev[isArc,1]-center[:,1],prev[isArc,0]-center[:,0])
+            a1=np.arctan2(pos[isArc,1]-center[:,1],pos[isArc,0]-center[:,0])
+            ccw=kind[moves][isArc]==3
+            sweep=np.where(ccw,a1-a0,a0-a1)%(2*np.pi)
+            sweep[sweep<1e-9]=2*np.pi#full circle
+            lengthXY[isArc]=np.hypot(*(prev[isArc,:2]-center).T)*sweep
+        length=np.hypot(lengthXY,d[:,2])
+        length=np.where(length>0,length,np.abs(de))
+        valid=length>0
+        moves,d,de,length,lengthXY,feedrate,moveAccel=moves[valid],d[valid],de[valid],length[valid],lengthXY[valid],feedrate[valid],moveAccel[valid]
+        if len(moves)==0:
+            return times
+        axes=np.abs(np.column_stack((d,de)))/length[:,None]# share of each axis
+        with np.errstate(divide="ignore"):
+            v=np.minimum(feedrate,np.min(lim["feedrate"]/axes,axis=1))
+            a=np.where((de>0)&(lengthXY>0),moveAccel[:,0],np.where(lengthXY>0,moveAccel[:,1],moveAccel[:,2]))
+            a=np.minimum(a,np.min(lim["acceleration"]/axes,axis=1))
+            #junction speeds by the jerk limits, squared speeds for the planner
+            direction=np.column_stack((d,de))/length[:,None]
+            change=np.abs(np.diff(direction,axis=0))
+            vJunction=np.minimum(np.minimum(v[:-1],v[1:]),np.min(lim["jerk"]/change,axis=1))
+        cap=np.concatenate(([0],vJunction**2,[0]))
+        gain=2*a*length
+        cap=limitRecurrence(cap,gain)#reachable by accelerating
+        cap=limitRecurrence(cap[::-1],gain[::-1])[::-1]#reachable by decelerating
+        v0=np.sqrt(cap[:-1])
+        v1=np.sqrt(cap[1:])
+        vPeak=np.minimum(v,np.sqrt((gain+cap[:-1]+cap[1:])/2))
+        cruise=np.maximum(length-(2*vPeak**2-cap[:-1]-cap[1:])/(2*a),0)
+        times[moves]+=(vPeak-v0)/a+(vPeak-v1)/a+cruise/vPeak
+        return times
+    def addModifiedLayer(self,idl:int,origLines:list,newLines:list,prevLines:list)->None:
+        startState=self.getStartState(prevLines)
+        self.layers[idl]=[(self.estimateLineTimes(origLines,startState,mode).sum(),self.estimateLineTimes(newLines,startState,mode)) for mode in range(2)]
+    def addLayer(self,lines:list)->None:
+        """Note the lines of a finished layer as they are written: the layer boundaries for rewriteProgress() and the total print time of the slicer."""
+        self.layerLengths.append(len(lines))
+        for line in lines:
+            if line.startswith("M73 ") or line.startswith("; estimated printing time"):
+                for mode,(name,pKey,rKey) in enumerate(self.modes):
+                    if line.startswith(f"; estimated printing time ({name} mode) = "):
+                        self.totals[mode]=parsePrintTime(line[len(f"; estimated printing time ({name} mode) = "):])
+                    elif self.firstRemaining[mode] is None and line.startswith(f"M73 {pKey}"):
+                        self.firstRemaining[mode]=float(line.split()[2][1:])*60
+    def rewriteProgress(self,lines):
+        """
+        Shift the M73 progress lines and the estimated printing time by the estimated difference of the modified layers.
+        Takes the lines of the whole file as noted by addLayer(), e.g. read back from the written file, and yields the rewritten lines layer by layer.
+        """
+        timelines=[]# per mode: name,keys,total,new total and the running state shift,elapsedOrig,lastElapsed
+        for mode,(name,pKey,rKey) in enumerate(self.modes):
+            total=self.totals[mode] if self.totals[mode] is not None else self.firstRemaining[mode]# binary gcode has no footer, the first M73 tells the total time in minutes
+            if total is None:
+                continue
+            totalDelta=sum(times[mode][1].sum()-times[mode][0] for times in self.layers.values())
+            newTotal=max(total+totalDelta,1)
+            timelines.append([mode,name,pKey,rKey,total,newTotal,0,0,0])
+            if self.parameters.get("RunSummary"):
+                self.parameters.get("RunSummary").count(f"Print time change {name} mode [s]",float(totalDelta))
+            log(f"estimated printing time ({name} mode): {formatPrintTime(total)} -> {formatPrintTime(newTotal)}")
+        lines=iter(lines)
+        for idl,layerLength in enumerate(self.layerLengths):
+            layerLines=list(itertools.islice(lines,layerLength))
+            for timeline in timelines:
+                mode,name,pKey,rKey,total,newTotal,shift,elapsedOrig,lastElapsed=timeline
+                footer=f"; estimated printing time ({name} mode) = "
+                lineTimes=None
+                if idl in self.layers:
+                    origTime,lineTimes=self.layers[idl][mode]
+                    elapsedAtLines=np.cumsum(lineTimes)
+                    layerStart=elapsedOrig+shift
+                for idline,line in enumerate(layerLines):
+                    if line.startswith(f"M73 {pKey}"):
+                        elapsedOrig=total-float(line.split()[2][1:])*60# the slicer's timeline, also read in modified layers to start the next layer from there
+                        if lineTimes is None:
+                            elapsed=elapsedOrig+shift
+                        else:
+                            elapsed=layerStart+elapsedAtLines[idline]
+                        elapsed=min(max(elapsed,lastElapsed),newTotal)# the progress never goes back, even if the slicer's and this estimate disagree
+                        lastElapsed=elapsed
+                        layerLines[idline]=f"M73 {pKey}{int(100*elapsed/newTotal)} {rKey}{int(round((newTotal-elapsed)/60))}\n"
+                    elif line.startswith(footer):
+                        layerLines[idline]=footer+formatPrintTime(newTotal)+"\n"
+                if lineTimes is not None:
+                    shift+=lineTimes.sum()-origTime
+                timeline[6:]=shift,elapsedOrig,lastElapsed
+            yield layerLines
+        rest=list(lines)
+        if rest:
+            yield rest
 
 ################################# HELPER FUNCTIONS GCode->Polygon #################################
 ###################################################################################################
 
+def isOverrideArg(arg:str)->bool:
+    key,sep,val=arg.partition("=")
+    return bool(sep) and key.isidentifier()
+
 def getFileStreamAndPath(read=True):
-    if len(sys.argv) != 2:
-        print("Usage: python3 ex1.py <filename>")
+    paths=[arg for arg in sys.argv[1:] if not isOverrideArg(arg)]
+    if len(paths) != 1:
+        print("Usage: python3 prusa_slicer_post_processing_script.py <filename> [Parameter=Value ...]")
         sys.exit(1)
-    filepath = sys.argv[1]
+    filepath = paths[0]
     try:
         if read:
-            f = open(filepath, "r")
+            f = openGCode(filepath)
         else:
             f=open(filepath, "w")    
         return f,filepath
@@ -403,19 +1268,31 @@ def getFileStreamAndPath(read=True):
         input("File not found.Press enter.")
         sys.exit(1)
         
-def splitGCodeIntoLayers(gcode:list)->list:
-    gcode_list = []
+def getCommandLineOverrides()->dict:
+    """Parameters can be changed per run by adding Parameter=Value to the command line, e.g. ArcEngine=raster"""
+    overrides={}
+    for arg in sys.argv[1:]:
+        if isOverrideArg(arg):
+            key,sep,val=arg.partition("=")
+            try:
+                overrides[key]=literal_eval(val)
+            except:
+                overrides[key]=val #plain strings
+    return overrides
+
+def splitGCodeIntoLayers(gcode:list):
+    """Yields the lines of one layer after another, the gcode is streamed."""
     buff=[]
+    linenumber=-1
     for linenumber,line in enumerate(gcode):
         if ";LAYER_CHANGE" in line:
-            gcode_list.append(buff)
+            yield buff
             buff=[]
             buff.append(line)
         else:
             buff.append(line)
-    gcode_list.append(buff)  #catch last layer
-    print("last read linenumber:",linenumber)            
-    return gcode_list
+    yield buff  #catch last layer
+    log("last read linenumber:",linenumber)
             
 def getPtfromCmd(line:str)->Point:
     x=None
@@ -445,13 +1322,15 @@ def makePolygonFromGCode(lines:list)->Polygon:
     if len(pts)>2:
         return Polygon(pts)
     else:
-        #print("invalid poly: not enough pts")
+        #log("invalid poly: not enough pts")
         return None  
 
 ################################# CLASSES #################################
 ###########################################################################
    
 class Layer():
+    __slots__=("lines","layernumber","z","height","fansetting","polys","validpolys","extPerimeterPolys","bufferedExtPerimeterPolys","startGeometryTree",
+               "binfills","sinfills","solidPolys","features","oldpolys","dontPerformPerimeterCheck","deleteTheseInfills","deletelines","associatedIDs","parameters","coolingRegion")
     def __init__(self,lines:list=[],kwargs:dict={},layernumber:int=-1)->None:
         self.lines=lines
         self.layernumber=layernumber
@@ -459,6 +1338,7 @@ class Layer():
         self.polys=[]
         self.validpolys=[]
         self.extPerimeterPolys=[]
+        self.startGeometryTree=None
         self.binfills=[]
         self.features=[]
         self.oldpolys=[]
@@ -468,7 +1348,20 @@ class Layer():
         self.associatedIDs=[]
         self.sinfills=[]
         self.parameters=kwargs
-        self.lastP=None
+        self.coolingRegion=None
+    def releaseGeometry(self)->None:
+        """Drop everything but the gcode lines once the layer and the layer above are processed."""
+        self.features=[]
+        self.polys=[]
+        self.validpolys=[]
+        self.extPerimeterPolys=[]
+        self.bufferedExtPerimeterPolys=None
+        self.startGeometryTree=None
+        self.binfills=[]
+        self.sinfills=[]
+        self.solidPolys=[]
+        self.oldpolys=[]
+        self.coolingRegion=None
     def extract_features(self)->None:
         buff=[]
         currenttype=""
@@ -501,7 +1394,7 @@ class Layer():
                 h=l.split(":")
                 self.height=float(h[-1])
                 return
-        warnings.warn(f"Layer {self.layernumber}: no height found, using layerheight default!")
+        logger.warning(f"Layer {self.layernumber}: no height found, using layerheight default!")
         self.height=self.parameters.get("layer_height")         
     def getRealFeatureStartPoint(self,idf:int)->Point:
         """ since GCode only stores destination of the move, the origin of the first move has to be included.""" 
@@ -526,7 +1419,7 @@ class Layer():
                         if type(pt)==type(Point):
                             linesWithStart.append(p2GCode(pt))
                         else:
-                            warnings.warn(f"Layer {self.layernumber}: Could not fetch real StartPoint.")
+                            logger.warning(f"Layer {self.layernumber}: Could not fetch real StartPoint.")
                 linesWithStart=linesWithStart+lines
                 extPerimeterIsStarted=True
             if (idf==len(self.features)-1 and extPerimeterIsStarted) or (extPerimeterIsStarted and not ("External" in ftype or "Overhang" in ftype)) :#finish the poly if end of featurelist or different feature
@@ -534,63 +1427,85 @@ class Layer():
                 if poly:
                     self.extPerimeterPolys.append(poly) 
                 extPerimeterIsStarted=False   
-    def makeStartLineString(self,poly:Polygon,kwargs:dict={}):
+    def prepareStartGeometry(self)->None:
+        """Buffer and prepare the external perimeters once and put them into a STRtree, shared by all overhang polys of the next layer."""
+        if self.startGeometryTree is not None:
+            return
         if not self.extPerimeterPolys:
             self.makeExternalPerimeter2Polys()
+        self.bufferedExtPerimeterPolys=shapely.buffer(np.array(self.extPerimeterPolys,dtype=object),1e-2)# avoid self intersection error
+        shapely.prepare(self.bufferedExtPerimeterPolys)
+        self.startGeometryTree=shapely.STRtree(self.bufferedExtPerimeterPolys)
+    def makeStartLineStrings(self,polys:list,kwargs:dict={})->list:
+        """Find StartLineString and remaining boundary for all polys of the next layer with one query. Returns a (startLineString,boundaryLineString) tuple per poly, (None,None) if not found."""
+        self.prepareStartGeometry()
         if len(self.extPerimeterPolys)<1:
-            warnings.warn(f"Layer {self.layernumber}: No ExternalPerimeterPolys found in prev Layer")
-            return None,None   
-        for ep in self.extPerimeterPolys:
-            ep=ep.buffer(1e-2)# avoid self intersection error
-            if ep.intersects(poly):
-                startArea=ep.intersection(poly)
-                startLineString=startArea.boundary.intersection(poly.boundary.buffer(1e-2))
-                if startLineString.is_empty:
-                    if poly.contains(startArea):#if inside no boundarys can overlap.
-                        startLineString=startArea.boundary
-                        boundaryLineString=poly.boundary
-                        if startLineString.is_empty:#still empty? unlikely to happen       
-                            plt.title("StartLineString is None")
-                            plot_geometry(poly,'b')
-                            plot_geometry(startArea,filled=True)
-                            plot_geometry([ep for ep in self.extPerimeterPolys])  
-                            plt.legend(["currentLayerPoly","StartArea","prevLayerPoly"])
-                            plt.axis('square')
-                            plt.show()  
-                            warnings.warn(f"Layer {self.layernumber}: No Intersection in Boundary,Poly+ExternalPoly")
-                            return None,None
-                else:    
-                    boundaryLineString=poly.boundary.difference(startArea.boundary.buffer(1e-2))
-                #print("STARTLINESTRING TYPE:",startLineString.geom_type)  
+            logger.warning(f"Layer {self.layernumber}: No ExternalPerimeterPolys found in prev Layer")
+            return [(None,None) for poly in polys]
+        polyIdx,epIdx=self.startGeometryTree.query(polys,predicate="intersects")
+        firstEp={}# like the loop over all perimeters: the first intersecting one is used
+        for idp,ide in zip(polyIdx.tolist(),epIdx.tolist()):
+            if ide<firstEp.get(idp,len(self.extPerimeterPolys)):
+                firstEp[idp]=ide
+        startGeometries=[]
+        for idp,poly in enumerate(polys):
+            if idp in firstEp:
+                startGeometries.append(self.makeStartLineString(poly,self.bufferedExtPerimeterPolys[firstEp[idp]],kwargs))
+                continue
+            if kwargs.get("plotStart"):
+                plt.title("no intersection with prev Layer Boundary")
+                plot_geometry(poly,'b')
+                plot_geometry([ep for ep in self.extPerimeterPolys])  
+                plt.legend(["currentLayerPoly","prevLayerPoly"])
+                plt.axis('square')
+                plt.show()  
+            logger.warning(f"Layer {self.layernumber}: No intersection with prevLayer External Perimeter detected") 
+            startGeometries.append((None,None))
+        return startGeometries
+    def makeStartLineString(self,poly:Polygon,ep:Polygon,kwargs:dict={}):
+        startArea=ep.intersection(poly)
+        startLineString=startArea.boundary.intersection(poly.boundary.buffer(1e-2))
+        if startLineString.is_empty:
+            if poly.contains(startArea):#if inside no boundarys can overlap.
+                startLineString=startArea.boundary
+                boundaryLineString=poly.boundary
+            if startLineString.is_empty:#still empty? unlikely to happen       
                 if kwargs.get("plotStart"):
-                    print("Geom-Type:",poly.geom_type)
-                    plot_geometry(poly,color="b")
-                    plot_geometry(ep,'g')
-                    plot_geometry(startLineString,color="m")
-                    plt.title("Start-Geometry")
-                    plt.legend(["Poly4ArcOverhang","External Perimeter prev Layer","StartLine for Arc Generation"])
+                    plt.title("StartLineString is None")
+                    plot_geometry(poly,'b')
+                    plot_geometry(startArea,filled=True)
+                    plot_geometry([ep for ep in self.extPerimeterPolys])  
+                    plt.legend(["currentLayerPoly","StartArea","prevLayerPoly"])
                     plt.axis('square')
                     plt.show()  
-                return startLineString,boundaryLineString
-        #end of for loop, and no intersection found        
-        plt.title("no intersection with prev Layer Boundary")
-        plot_geometry(poly,'b')
-        plot_geometry([ep for ep in self.extPerimeterPolys])  
-        plt.legend(["currentLayerPoly","prevLayerPoly"])
-        plt.axis('square')
-        plt.show()  
-        warnings.warn(f"Layer {self.layernumber}: No intersection with prevLayer External Perimeter detected") 
-        return None,None
+                logger.warning(f"Layer {self.layernumber}: No Intersection in Boundary,Poly+ExternalPoly")
+                return None,None
+        else:    
+            boundaryLineString=poly.boundary.difference(startArea.boundary.buffer(1e-2))
+        #log("STARTLINESTRING TYPE:",startLineString.geom_type)  
+        if kwargs.get("plotStart"):
+            log("Geom-Type:",poly.geom_type)
+            plot_geometry(poly,color="b")
+            plot_geometry(ep,'g')
+            plot_geometry(startLineString,color="m")
+            plt.title("Start-Geometry")
+            plt.legend(["Poly4ArcOverhang","External Perimeter prev Layer","StartLine for Arc Generation"])
+            plt.axis('square')
+            plt.show()  
+        return startLineString,boundaryLineString
 
     def mergePolys(self,thesepolys:list=None)-> list:
         if not thesepolys:
             thesepolys=self.polys
-        mergedPolys = unary_union(thesepolys)
-        #print("Merged Geometry Type:",mergedPolys.geom_type)
+        gridSize=self.parameters.get("InfillMergeGridSize",0)
+        mergedPolys=shapely.union_all(thesepolys,grid_size=gridSize if gridSize>0 else None)
+        if self.parameters.get("InfillMergeSimplifyTolerance",0)>0:
+            mergedPolys=shapely.simplify(mergedPolys,self.parameters.get("InfillMergeSimplifyTolerance"))
+        #log("Merged Geometry Type:",mergedPolys.geom_type)
         if mergedPolys.geom_type=="Polygon":
             thesepolys=[mergedPolys]
         elif mergedPolys.geom_type=="MultiPolygon" or mergedPolys.geom_type=="GeometryCollection":
-            thesepolys=[poly for poly in mergedPolys.geoms] 
+            thesepolys=[poly for poly in mergedPolys.geoms if poly.geom_type=="Polygon"] 
         return thesepolys
     def spotFeaturePoints(self,featureName:str,splitAtWipe=False,includeRealStartPt=False, splitAtTravel=False)->list:
         parts=[]
@@ -608,7 +1523,7 @@ class Layer():
                 for line in lines:
                     if "G1" in line and (not isWipeMove):
                         if (not "E" in line) and travelstr in line and splitAtTravel:
-                            #print(f"Layer {self.layernumber}: try to split feature. No. of pts before:",len(pts))
+                            #log(f"Layer {self.layernumber}: try to split feature. No. of pts before:",len(pts))
                             if len(pts)>=2:#make at least 1 ls
                                 parts.append(pts)
                                 pts=[]# update self.features... TODO
@@ -631,36 +1546,54 @@ class Layer():
         for infillpts in parts:
             if self.verifySolidInfillPts(infillpts):
                 self.sinfills.append(LineString(infillpts))
+    def bufferInfillLines(self,lineStrings,extend:float)->np.ndarray:
+        """Extend all infill lines to areas in one call."""
+        return shapely.buffer(lineStrings,extend,quad_segs=self.parameters.get("InfillBufferQuadSegs",8),join_style=self.parameters.get("InfillBufferJoinStyle","round"))
     def makePolysFromSolidInfill(self,extend:float=1)->None:
-        self.solidPolys=[]
-        for sInfill in self.sinfills:
-            infillPoly=sInfill.buffer(extend)
-            self.solidPolys.append(infillPoly)
-            if self.parameters.get("plotDetectedSolidInfillPoly"):
+        self.solidPolys=list(self.bufferInfillLines(np.array(self.sinfills,dtype=object),extend))
+        if self.parameters.get("plotDetectedSolidInfillPoly"):
+            for sInfill,infillPoly in zip(self.sinfills,self.solidPolys):
                 plot_geometry(infillPoly)
                 plot_geometry(sInfill,"g")
                 plt.axis('square')
                 plt.show()
     def verifySolidInfillPts(self,infillpts:list)->bool:
         '''Verify SollidInfillPts by checking if >=1 of the Points is inside the desired polygon-locations.'''
-        for p in infillpts:
-                for poly in self.oldpolys:
-                    if poly.contains(p):
-                        return True          
-        return False   
+        return bool(self.inCoolingRegion(np.array([[p.x,p.y] for p in infillpts])).any())
+    def getCoolingRegion(self):
+        """The overhangs of the layers below that need special cooling, merged and prepared for fast queries. Built on first use, None if there are none."""
+        if self.coolingRegion is None and self.oldpolys:
+            self.coolingRegion=shapely.union_all(self.oldpolys)
+            shapely.prepare(self.coolingRegion)
+        return self.coolingRegion
+    def inCoolingRegion(self,xy:np.ndarray)->np.ndarray:
+        """For each point (n,2): True if inside the cooling region."""
+        region=self.getCoolingRegion()
+        if region is None or len(xy)==0:
+            return np.zeros(len(xy),dtype=bool)
+        return shapely.contains_xy(region,xy[:,0],xy[:,1])
+    def nearCoolingRegion(self,geoms:np.ndarray,distance:float)->np.ndarray:
+        """For each geometry: True if within distance of the cooling region."""
+        region=self.getCoolingRegion()
+        if region is None or len(geoms)==0:
+            return np.zeros(len(geoms),dtype=bool)
+        return shapely.dwithin(region,geoms,distance)# the prepared geometry is only used as first argument
 
     def spotBridgeInfill(self)->None:
         parts=self.spotFeaturePoints("Bridge infill",splitAtTravel=True)
         for idf,infillpts in enumerate(parts):
-            self.binfills.append(BridgeInfill(infillpts))
+            self.binfills.append(BridgeInfill(np.array([[p.x,p.y] for p in infillpts])))
     def makePolysFromBridgeInfill(self,extend:float=1)->None:
-        for bInfill in self.binfills:
-            infillPts=bInfill.pts
-            infillLS=LineString(infillPts)
-            infillPoly=infillLS.buffer(extend)
-            self.polys.append(infillPoly)
-            self.associatedIDs.append(bInfill.id)
-            if self.parameters.get("plotDetectedInfillPoly"):
+        if not self.binfills:
+            return
+        coords=np.concatenate([bInfill.pts for bInfill in self.binfills])
+        indices=np.repeat(np.arange(len(self.binfills)),[len(bInfill.pts) for bInfill in self.binfills])
+        infillLSs=shapely.linestrings(coords,indices=indices)
+        infillPolys=self.bufferInfillLines(infillLSs,extend)
+        self.polys.extend(infillPolys)
+        self.associatedIDs.extend(bInfill.id for bInfill in self.binfills)
+        if self.parameters.get("plotDetectedInfillPoly"):
+            for infillLS,infillPoly in zip(infillLSs,infillPolys):
                 plot_geometry(infillPoly)
                 plot_geometry(infillLS,"g")
                 plt.axis('square')
@@ -675,21 +1608,20 @@ class Layer():
         '''Verify a poly by measuring the distance to any overhang parameters. Valid if measuredDist<minDistForValidation'''
         overhangs=self.getOverhangPerimeterLineStrings()
         if len(overhangs)>0:
-            if self.parameters.get("PrintDebugVerification"):print(f"Layer {self.layernumber}: {len(overhangs)} Overhangs found")
+            if self.parameters.get("PrintDebugVerification"):log(f"Layer {self.layernumber}: {len(overhangs)} Overhangs found")
             allowedSpacePolygon=self.parameters.get("AllowedSpaceForArcs")
             if not allowedSpacePolygon:
-                input(f"Layer {self.layernumber}: no allowed space Polygon provided to layer obj, unable to run script. Press Enter.")
                 raise ValueError(f"Layer {self.layernumber}: no allowed space Polygon provided to layer obj")
-            if self.parameters.get("PrintDebugVerification"):print("No of Polys:",len(self.polys))    
+            if self.parameters.get("PrintDebugVerification"):log("No of Polys:",len(self.polys))    
             for idp,poly in enumerate(self.polys):
                 if not poly.is_valid:
-                    if self.parameters.get("PrintDebugVerification"):print(f"Layer {self.layernumber}: Poly{idp} is (shapely-)invalid")
+                    if self.parameters.get("PrintDebugVerification"):log(f"Layer {self.layernumber}: Poly{idp} is (shapely-)invalid")
                     continue
                 if (not allowedSpacePolygon.contains(poly)) and self.parameters.get("CheckForAllowedSpace"):
-                    if self.parameters.get("PrintDebugVerification"):print(f"Layer {self.layernumber}: Poly{idp} is not in allowedSpacePolygon")
+                    if self.parameters.get("PrintDebugVerification"):log(f"Layer {self.layernumber}: Poly{idp} is not in allowedSpacePolygon")
                     continue
                 if poly.area<self.parameters.get("MinArea"):
-                    if self.parameters.get("PrintDebugVerification"):print(f"Layer {self.layernumber}: Poly{idp} has to little area: {poly.area:.2f}")
+                    if self.parameters.get("PrintDebugVerification"):log(f"Layer {self.layernumber}: Poly{idp} has to little area: {poly.area:.2f}")
                     continue               
                 for ohp in overhangs:
                     if poly.distance(ohp)<minDistForValidation:
@@ -697,27 +1629,24 @@ class Layer():
                             self.validpolys.append(poly)
                             self.deleteTheseInfills.append(idp)
                             break
-                if self.parameters.get("PrintDebugVerification"):print(f"Layer {self.layernumber}: Poly{idp} is not close enough to overhang perimeters")        
+                if self.parameters.get("PrintDebugVerification"):log(f"Layer {self.layernumber}: Poly{idp} is not close enough to overhang perimeters")        
 
     
     def prepareDeletion(self,featurename:str="Bridge",polys:list=None)->None:
-        if not polys:
-            polys=self.validpolys
+        """Mark every feature of this type with at least one point inside the polys for deletion. Without polys the cooling region is used for solid infill and the validpolys else."""
+        if not polys and featurename==":Solid":
+            inRegion=self.inCoolingRegion
+        else:
+            region=shapely.union_all(polys if polys else self.validpolys)
+            shapely.prepare(region)
+            inRegion=lambda xy:shapely.contains_xy(region,xy[:,0],xy[:,1])
         for idf,fe in enumerate(self.features):
             ftype=fe[0]
             lines=fe[1]
             start=fe[2]
-            deleteThis=False
             if featurename in ftype:
-                for poly in polys:
-                    for line in lines:
-                        p=getPtfromCmd(line)
-                        if p:
-                            if poly.contains(p):
-                                deleteThis=True
-                                break
-                        if deleteThis:
-                            break 
+                pts=[p for p in map(getPtfromCmd,lines) if p]
+                deleteThis=bool(pts) and inRegion(np.array([[p.x,p.y] for p in pts])).any()
                 if deleteThis:           
                     if idf<len(self.features)-1:
                         end=self.features[idf+1][2]-1 # TODO: prevent deletion of last travel move.
@@ -733,7 +1662,7 @@ class Layer():
         return export            
 
     def createHilbertCurveInPoly(self,poly:Polygon):
-        print("making hilbert surface")
+        log("making hilbert surface")
         dimensions=2
         w=self.parameters.get("solid_infill_extrusion_width")
         a=self.parameters.get("HilbertFillingPercentage")/100
@@ -747,46 +1676,45 @@ class Layer():
         iterationCount=int(np.ceil(np.log((a*l+w)/w)/np.log(2))) # + applied ceiling function to ensucre full coverage.
         scale=w/a#l/(2**iterationCount-1)/a
         maxidx=int(2**(dimensions* iterationCount) - 1)
-        locs = decode(np.arange(maxidx), 2, iterationCount)# hilbertidx->(x,y) first argument: idx, second: dimensions, third: bits per dim
         #move the curve 1 point in the smaller direction every second layer=>web the curves in z together by overlapping.
         movX=self.layernumber%2*w/a
         movY=self.layernumber%2*w/a
-        x=locs[:,0]*scale+minX-movX
-        y=locs[:,1]*scale+minY-movY
-        hilbertPointsRaw=[[xi,yi] for xi,yi in zip(x.tolist(),y.tolist())]
+        toXY=lambda locs:(locs[:,0]*scale+minX-movX,locs[:,1]*scale+minY-movY)
         noEl=int(np.ceil(mmBetweenTravels/scale))
-        buff=[]
         compositeList=[]
-        #divide in subset of n elements and shuffle them to prevent localized overheating.
-        for el in hilbertPointsRaw:
-            p=Point(el)
-            if p.within(poly):
-                buff.append(p)
-            else:
-                if len(buff)>5:#neglegt very small pieces
-                    if len(buff)>noEl*1.7:
-                        compositeList.extend([buff[x:x+noEl] for x in range(0, len(buff),noEl)])
-                    else:    
-                        compositeList.append(buff)
-                buff=[]#delete single pts if there.
-        if len(buff)>5:
-            compositeList.append(buff) #catch last one
-        random.shuffle(compositeList)
+        #divide in subset of n elements, orderHilbertChunks() spreads them to prevent localized overheating.
+        for start,end in getHilbertRunsInPoly(poly,iterationCount,maxidx,toXY):
+            if end-start<=5:#neglegt very small pieces
+                continue
+            x,y=toXY(decode(np.arange(start,end),dimensions,iterationCount))# hilbertidx->(x,y) first argument: idx, second: dimensions, third: bits per dim
+            buff=[Point(xi,yi) for xi,yi in zip(x.tolist(),y.tolist())]
+            if end-start>noEl*1.7 and end<maxidx:# the run at the end of the curve is kept in one piece
+                compositeList.extend([buff[x:x+noEl] for x in range(0, len(buff),noEl)])
+            else:    
+                compositeList.append(buff)
         return compositeList
-    def isClose2Bridging(self,line:str,minDetectionDistance:float=3):
-        if not "G1" in line:
-            return False
-        p=getPtfromCmd(line)
-        if not p:
-            return False
-        if not self.lastP:
-            self.lastP=Point(p.x-0.01,p.y-0.01)    
-        ls=LineString([p,self.lastP])
-        self.lastP=p
-        for poly in self.oldpolys:
-            if ls.distance(poly)<minDetectionDistance:
-                return True
-        return False        
+    def spotLinesClose2Bridging(self,minDetectionDistance:float=3)->np.ndarray:
+        """For each line: True if it is a move closer than minDetectionDistance to the cooling region. Deleted lines are skipped, the move starts at the last exported point."""
+        close=np.zeros(len(self.lines),dtype=bool)
+        if self.getCoolingRegion() is None:
+            return close
+        ids=[]
+        segments=[]
+        lastP=None
+        for idline,line in enumerate(self.lines):
+            if not "G1" in line or not self.exportThisLine(idline):
+                continue
+            p=getPtfromCmd(line)
+            if not p:
+                continue
+            if lastP is None:
+                lastP=(p.x-0.01,p.y-0.01)
+            segments.append([(p.x,p.y),lastP])
+            ids.append(idline)
+            lastP=(p.x,p.y)
+        if segments:
+            close[ids]=self.nearCoolingRegion(shapely.linestrings(segments),minDetectionDistance)
+        return close
     def spotFanSetting(self,lastfansetting:float):
         for line in self.lines:
             if "M106" in line.split(";")[0]:
@@ -800,36 +1728,44 @@ class Layer():
 
             
 class Arc():
-    def __init__(self,center:Point,r:float,kwargs:dict={}) -> None:
+    """One circle segment. The clipped poly is only kept while needed for seeding, the arcline is stored as (n,2) array of coordinates."""
+    __slots__=("center","r","group","parentGroup","pointsPerCircle","poly","arcline")
+    def __init__(self,center:Point,r:float,kwargs:dict={},pointsPerCircle:int=None) -> None:
         self.center=center
         self.r=r
-        self.pointsPerCircle=kwargs.get("PointsPerCircle",80)
-        self.parameters=kwargs
+        self.group=0
+        self.parentGroup=-1
+        self.pointsPerCircle=pointsPerCircle if pointsPerCircle else getPointsPerCircle(r,kwargs)
+        self.poly=None
+        self.arcline=np.empty((0,2))
     def setPoly(self,poly:Polygon)->None:
         self.poly=poly    
+    def releasePoly(self)->None:
+        self.poly=None
+    def getLineString(self)->LineString:
+        return LineString(self.arcline) if len(self.arcline)>1 else LineString()
     def extractArcBoundary(self):
         circ=create_circle(self.center,self.r,self.pointsPerCircle)    
         trueArc=self.poly.boundary.intersection(circ.boundary.buffer(1e-2))
         if trueArc.geom_type=='MultiLineString':
             merged=linemerge(trueArc)
         elif trueArc.geom_type=='LineString':
-            self.arcline=trueArc
-            return trueArc
+            self.arcline=shapely.get_coordinates(trueArc)
+            return self.arcline
         else:
-            #print("Other Geom-Type:",trueArc.geom_type)
+            #log("Other Geom-Type:",trueArc.geom_type)
             merged=linemerge(MultiLineString([l for l in trueArc.geoms if l.geom_type=='LineString']))
         if merged.geom_type=="LineString":
-            self.arcline=merged
-            return merged                             
+            self.arcline=shapely.get_coordinates(merged)
+            return self.arcline
         elif merged.geom_type=="MultiLineString":
             arcList=[]
             for ls in merged.geoms:
-                arc=Arc(self.center,self.r,self.parameters)
-                arc.arcline=ls
+                arc=Arc(self.center,self.r,pointsPerCircle=self.pointsPerCircle)
+                arc.arcline=shapely.get_coordinates(ls)
                 arcList.append(arc)
             return arcList
         else:
-            input("ArcBoundary merging Error.Unable to run script. Press Enter.")
             raise ValueError("ArcBoundary merging Error")
     def generateConcentricArc(self,startpt:Point,remainingSpace:Polygon)->Polygon:
         circ=create_circle(startpt,self.r,self.pointsPerCircle)
@@ -837,8 +1773,107 @@ class Arc():
         self.poly=arc
         return arc            
 
+class RunSummary():
+    """Counters and timings collected during a run, printed at the end."""
+    def __init__(self)->None:
+        self.counters={}
+        self.timers={}
+    def count(self,key:str,n:int=1)->None:
+        self.counters[key]=self.counters.get(key,0)+n
+    def addTime(self,key:str,seconds:float)->None:
+        self.timers[key]=self.timers.get(key,0)+seconds
+    def asDict(self)->dict:
+        return {"counters":dict(self.counters),"timers":dict(self.timers)}
+    def report(self)->None:
+        for key,val in self.counters.items():
+            log(f"{key}: {round(val,1) if isinstance(val,float) else val}")
+        for key,val in self.timers.items():
+            log(f"{key}: {val:.2f}s")
+
+class SolidFillCache():
+    """
+    Least recently used cache for the merged solid infill polys and the hilbert chunks, the layers above an overhang often have the same solid infill.
+    Hits and misses are counted in the RunSummary. The entries are shared, they must not be modified. maxSize=0 disables the cache.
+    """
+    def __init__(self,maxSize:int=64,summary:RunSummary=None)->None:
+        self.maxSize=maxSize
+        self.summary=summary
+        self.entries=collections.OrderedDict()
+    def get(self,kind:str,key:bytes):
+        """The cached value or None. kind names the counters."""
+        if self.maxSize<=0:
+            return None
+        value=self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        if self.summary:
+            self.summary.count(f"{kind} cache {'misses' if value is None else 'hits'}")
+        return value
+    def put(self,key:bytes,value)->None:
+        if self.maxSize<=0:
+            return
+        self.entries[key]=value
+        self.entries.move_to_end(key)
+        while len(self.entries)>self.maxSize:
+            self.entries.popitem(last=False)
+
+def getGeometryFingerprint(geoms:list,*extra)->bytes:
+    """Hash of the geometries, independent of start point and orientation of the rings, coordinates rounded to 1e-6mm. extra values are hashed too."""
+    digest=hashlib.blake2b(repr(extra).encode(),digest_size=16)
+    for geom in geoms:
+        coords=shapely.get_coordinates(shapely.normalize(geom))
+        digest.update(geom.geom_type.encode())
+        digest.update(len(coords).to_bytes(4,"little"))
+        digest.update(np.round(coords,6).tobytes())
+    return digest.digest()
+
+class WarningRecorder(logging.Handler):
+    """Collects the logged warnings of the thread that created it, for the summary of process()."""
+    def __init__(self)->None:
+        super().__init__(logging.WARNING)
+        self.thread=threading.get_ident()
+        self.messages=[]
+    def emit(self,record:logging.LogRecord)->None:
+        if record.thread==self.thread:
+            self.messages.append(record.getMessage())
+
+class TimeBudget():
+    """
+    Wall clock budget for the arc generation of one polygon. The engines ask degrade() for every arc, when the budget is nearly used up
+    they continue with coarser settings. Once it is used up completely, the polygon keeps its original bridge infill.
+    """
+    stages=("","coarser circles","larger MaxDistanceFromPerimeter","original bridge infill kept")
+    def __init__(self,seconds:float=0,reason:str="")->None:
+        self.start=time.perf_counter()
+        self.seconds=seconds
+        self.reason=reason
+        self.stage=0
+        self.overrides={}# degraded settings, applied to the parameters of every caller
+    def elapsed(self)->float:
+        return time.perf_counter()-self.start
+    def degrade(self,parameters:dict)->dict:
+        """Returns the parameters to continue with: once a stage is reached, every caller gets a copy with the degraded settings of all stages so far."""
+        if self.seconds and self.stage<3:
+            share=self.elapsed()/self.seconds
+            stage=3 if share>=1 else 2 if share>=0.75 else 1 if share>=0.5 else 0
+            if self.stage<1 and stage>=1:
+                self.overrides["PointsPerCircle"]=max(parameters.get("PointsPerCircle",80)//2,16)
+                self.overrides["MaxChordError"]=parameters.get("MaxChordError",0.01)*4 # about half the points
+            if self.stage<2 and stage>=2:
+                self.overrides["MaxDistanceFromPerimeter"]=parameters.get("MaxDistanceFromPerimeter")*2
+            self.stage=max(stage,self.stage)
+        if not self.overrides:
+            return parameters
+        return dict(parameters,**self.overrides)
+    def isExhausted(self)->bool:
+        return self.stage>=3
+    def describe(self)->str:
+        return f"{', '.join(self.stages[1:self.stage+1])} after {self.elapsed():.1f}s ({self.reason})"
+
 class BridgeInfill():
-    def __init__(self,pts=[],id=random.randint(1,int(1e10))) -> None:
+    """Points of one bridge infill path as (n,2) array."""
+    __slots__=("pts","deleteLater","id")
+    def __init__(self,pts=np.empty((0,2)),id=random.randint(1,int(1e10))) -> None:
         self.pts=pts
         self.deleteLater=False
         self.id=id
@@ -849,59 +1884,124 @@ class BridgeInfill():
 def midpoint(p1:Point, p2:Point):
     return Point((p1.x + p2.x)/2, (p1.y + p2.y)/2)
 
-def getStartPtOnLS(ls:LineString,kwargs:dict={},choseRandom:bool=False)->Point:
+def getLongestLineString(ls:LineString)->LineString:
     if ls.geom_type=="MultiLineString" or ls.geom_type=="GeometryCollection":
         lengths=[]
         for lss in ls.geoms:
             if lss.geom_type=="LineString":
                 lengths.append(lss.length)
             else:
-                print("Startline Item bizzare Type of geometry:",lss.geom_type)    
+                log("Startline Item bizzare Type of geometry:",lss.geom_type)    
                 lengths.append(0)      
-        lsidx=np.argmax(lengths)
-        if not lsidx.is_integer():
-            try:
-                lsidx=lsidx[0]#if multiple max values: take first occurence
-            except:
-                print("Exception used for lsidx, should be int:", lsidx)
-                lsidx=0
-        ls=ls.geoms[lsidx]
+        ls=ls.geoms[int(np.argmax(lengths))]#if multiple max values: take first occurence
     if len(ls.coords)<2:
-        warnings.warn("Start LineString with <2 Points invalid")
-        input("Can not run script, gcode unmodified. Press Enter")
+        logger.warning("Start LineString with <2 Points invalid")
         raise ValueError("Start LineString with <2 Points invalid")
-    if len(ls.coords)==2:
-        return midpoint(Point(ls.coords[0]),Point(ls.coords[1]))
-    scores=[]
-    curLength=0
-    pts=[Point(p) for p in ls.coords]
-    if choseRandom:
-        return random.choice(pts)
-    coords=[np.array(p) for p in ls.coords]
-    for idp,p in enumerate(pts):
-        if idp==0 or idp==len(pts)-1:
-            scores.append(0)
-            continue
-        curLength+=p.distance(pts[idp-1])
-        relLength=curLength/ls.length
-        lengthscore=1-np.abs(relLength-0.5)#Hat-function: pointscore=1 at relLength=0.5, 0 at start or end.
-        v1=coords[idp]-coords[idp-1]
-        v2=coords[idp+1]-coords[idp]
-        if np.linalg.norm(v1)>0 and np.linalg.norm(v2)>0:#calc angle only for non-zero-vectors
-            v1=v1/np.linalg.norm(v1)
-            v2=v2/np.linalg.norm(v2)
-            anglescore=np.abs(np.sin(np.arccos(np.clip(np.dot(v1, v2), -1.0, 1.0))))#prefer points at corners
-            anglescore*=kwargs.get("CornerImportanceMultiplier",1)
-            scores.append(lengthscore+anglescore)
+    return ls
+
+def getStartPtCandidatesOnLS(ls:LineString,kwargs:dict={},k:int=1)->list:
+    """Rank the points of the StartLineString, best first. Points close to the middle of the line and at corners are preferred. Returns up to k points."""
+    ls=getLongestLineString(ls)
+    coords=np.asarray(ls.coords)
+    if len(coords)==2:
+        return [midpoint(Point(coords[0]),Point(coords[1]))]
+    segments=np.diff(coords,axis=0)
+    segLengths=np.hypot(segments[:,0],segments[:,1])
+    relLength=np.cumsum(segLengths)[:-1]/ls.length
+    lengthscore=1-np.abs(relLength-0.5)#Hat-function: pointscore=1 at relLength=0.5, 0 at start or end.
+    v1=segments[:-1]
+    v2=segments[1:]
+    isCorner=(segLengths[:-1]>0)&(segLengths[1:]>0)#calc angle only for non-zero-vectors
+    with np.errstate(invalid="ignore",divide="ignore"):
+        cosAngle=np.clip(np.sum(v1*v2,axis=1)/(segLengths[:-1]*segLengths[1:]),-1.0,1.0)
+    anglescore=np.where(isCorner,np.abs(np.sin(np.arccos(cosAngle))),0)*kwargs.get("CornerImportanceMultiplier",1)#prefer points at corners
+    scores=np.zeros(len(coords))
+    scores[1:-1]=lengthscore+anglescore
+    ranking=np.argsort(-scores,kind="stable")[:k]
+    return [Point(coords[idx]) for idx in ranking]
+
+def getStartPtOnLS(ls:LineString,kwargs:dict={})->Point:
+    return getStartPtCandidatesOnLS(ls,kwargs,k=1)[0]
+
+def getRankedStartPts(startLineString:LineString,kwargs:dict={}):
+    """Yields the startpoints to try in this order: the best one, then the best ones on the redistributed StartLineString, then the next best ones of the original."""
+    k=kwargs.get("StartPtCandidates",10)
+    candidates=getStartPtCandidatesOnLS(startLineString,kwargs,k)
+    yield candidates[0]
+    redistributedLS=redistribute_vertices(startLineString,kwargs.get("DistanceBetweenPointsOnStartLine",0.1))
+    yield from getStartPtCandidatesOnLS(redistributedLS,kwargs,k)
+    yield from candidates[1:]
+    #last resort: random points, reproducible by the seed
+    coords=list(getLongestLineString(redistributedLS).coords)
+    rng=random.Random(kwargs.get("StartPtRetrySeed",0))
+    for xy in rng.sample(coords,min(kwargs.get("StartPtRandomCandidates",10),len(coords))):
+        yield Point(xy)
+
+def countPossibleStartArcs(startpt:Point,boundaryLineString:LineString,rMinStart:float,rMax:float,kwargs:dict={})->int:
+    """Cheap upper bound for the number of concentric arcs around startpt, needs only one distance calculation."""
+    rLimit=rMax
+    if not kwargs.get("UseLeastAmountOfCenterPoints",False):
+        #generation stops at the first arc touching the boundary. The discretized circle contains at least the disk with r*cos(pi/n), r-MaxChordError for the adaptive discretization.
+        if kwargs.get("CircleDiscretization","fixed")=="chorderror":
+            rLimit=min(rMax,startpt.distance(boundaryLineString)+kwargs.get("MaxChordError",0.01))
         else:
-            scores.append(lengthscore)    
-    maxIndex=scores.index(max(scores))
-    return pts[maxIndex]
+            rLimit=min(rMax,startpt.distance(boundaryLineString)/np.cos(np.pi/kwargs.get("PointsPerCircle",80)))
+    if rLimit<rMinStart:
+        return 0
+    return int(np.floor((rLimit-rMinStart)/kwargs.get("ArcWidth")+1e-9))+1
+
+def findStartPt(startLineString:LineString,boundaryLineString:LineString,rMinStart:float,rMax:float,evaluateStartPt,kwargs:dict={},layernumber:int=-1)->tuple:
+    """
+    Try the ranked startpoints until one gives at least MinStartArcs arcs. Candidates that can not reach MinStartArcs by their distance to the boundary are skipped without any arc generation.
+    evaluateStartPt(startpt,maxArcs) has to return the generated arcs, it is only asked for MinStartArcs arcs.
+    Returns the startpoint and the result of evaluateStartPt, or None,None.
+    """
+    minStartArcs=kwargs.get("MinStartArcs")
+    summary=kwargs.get("RunSummary") or RunSummary()
+    t=time.perf_counter()
+    tries=0
+    skipped=0
+    for startpt in getRankedStartPts(startLineString,kwargs):
+        if countPossibleStartArcs(startpt,boundaryLineString,rMinStart,rMax,kwargs)<minStartArcs:
+            skipped+=1
+            continue
+        tries+=1
+        arcs=evaluateStartPt(startpt,minStartArcs)
+        if len(arcs)>=minStartArcs:
+            break
+    else:
+        startpt,arcs=None,None
+    dt=time.perf_counter()-t
+    summary.count("Startpoint retries",max(tries-1,0))
+    summary.count("Startpoints ruled out by distance",skipped)
+    summary.addTime("Startpoint search",dt)
+    if tries>1 or skipped>0:
+        log(f"Layer {layernumber}: {'found' if startpt else 'no'} startpoint after {tries} tries, {skipped} ruled out by distance, {dt:.2f}s")
+    return startpt,arcs
+
+@functools.lru_cache(maxsize=256)
+def getUnitCircle(n:int)->np.ndarray:
+    """Vertices of the unit circle with n points, computed once per n."""
+    theta=np.linspace(0, 2*np.pi - 2*np.pi/n, int(n))
+    table=np.column_stack((np.sin(theta),np.cos(theta)))
+    table.flags.writeable=False
+    return table
+
+def getPointsPerCircle(r:float,kwargs:dict={})->int:
+    """
+    Number of vertices of the discretized circle with radius r. "fixed": always PointsPerCircle.
+    "chorderror": as few as possible while the chords stay within MaxChordError of the true circle, rounded up to a multiple of 4 to reuse the unit circle tables.
+    """
+    if kwargs.get("CircleDiscretization","fixed")!="chorderror":
+        return kwargs.get("PointsPerCircle",80)
+    maxChordError=kwargs.get("MaxChordError",0.01)
+    if maxChordError>=r:
+        return 8
+    n=int(np.ceil(np.pi/np.arccos(1-maxChordError/r)))
+    return max(8,-(-n//4)*4)
 
 def create_circle(p:Point, radius:float, n:int)->Polygon:
-    x=p.x
-    y=p.y
-    return Polygon([[radius*np.sin(theta)+x, radius*np.cos(theta)+y] for theta in np.linspace(0, 2*np.pi - 2*np.pi/n, int(n))])       
+    return Polygon(radius*getUnitCircle(int(n))+(p.x,p.y))
 
 def get_farthest_point(arc:Polygon, base_poly:Polygon, remaining_empty_space:Polygon):#function ported from Steven McCulloch
     """
@@ -934,7 +2034,7 @@ def get_farthest_point(arc:Polygon, base_poly:Polygon, remaining_empty_space:Pol
     elif arc.geom_type == 'LineString':
         arc_coords = np.linspace(list(arc.coords)[0], list(arc.coords)[1])
     else:
-        print('get_farthest_distance: Wrong shape type given',type(arc))
+        log('get_farthest_distance: Wrong shape type given',type(arc))
         plt.title("Function get_farthest_point went wrong")
         plot_geometry(base_poly,"b")
         plot_geometry(arc,"r")
@@ -973,29 +2073,600 @@ def redistribute_vertices(geom:LineString, distance:float)->LineString:
         num_vert = int(round(geom.length / distance))
         if num_vert == 0:
             num_vert = 1
-        return LineString(
-            [geom.interpolate(float(n) / num_vert, normalized=True)
-             for n in range(num_vert + 1)])
+        return LineString(shapely.line_interpolate_point(geom,np.arange(num_vert + 1) / num_vert,normalized=True))
     elif geom.geom_type == 'MultiLineString':
         parts = [redistribute_vertices(part, distance) for part in geom.geoms]
         return type(geom)([p for p in parts if not p.is_empty])
     else:
-        warnings.warn('unhandled geometry %s', (geom.geom_type,))
+        logger.warning('unhandled geometry %s', geom.geom_type)
         return geom
     
-def generateMultipleConcentricArcs(startpt:Point,rMin:float,rMax:float, boundaryLineString:LineString,remainingSpace:Polygon,kwargs={})->list:
+def makeTimeBudget(parameters:dict,fileDeadline:float=None)->TimeBudget:
+    """Budget for the next polygon: TimeBudgetPerPolygon, limited by the time left of TimeBudgetPerFile."""
+    seconds=parameters.get("TimeBudgetPerPolygon",0)
+    reason=f"polygon budget of {seconds}s"
+    if fileDeadline is not None:
+        remaining=fileDeadline-time.perf_counter()
+        if not seconds or remaining<seconds:
+            seconds=max(remaining,1e-9)
+            reason="file budget"
+    return TimeBudget(seconds,reason)
+
+def generateArcsInPoly(poly:Polygon,startLineString:LineString,boundaryWithOutStartLine:LineString,parameters:dict,layernumber:int=-1)->tuple:
+    """Fill the poly with the engine chosen by 'ArcEngine'. With 'BenchmarkArcEngines' all engines are run and compared."""
+    engines={"exact":generateArcsExact,"raster":generateArcsRaster}
+    engine=parameters.get("ArcEngine","exact")
+    if engine not in engines:
+        raise ValueError(f"Unknown ArcEngine '{engine}', use one of {list(engines.keys())}")
+    budget=parameters.get("TimeBudget") or TimeBudget()
+    parameters=budget.degrade(parameters)
+    if budget.isExhausted():
+        return None,None
+    if not parameters.get("BenchmarkArcEngines"):
+        return engines[engine](poly,startLineString,boundaryWithOutStartLine,parameters,layernumber)
+    results={}
+    for name,generateArcs in engines.items():
+        t=time.perf_counter()
+        arcs4gcode,remain2FillPercent=generateArcs(poly,startLineString,boundaryWithOutStartLine,parameters if name==engine else dict(parameters),layernumber)
+        dt=time.perf_counter()-t
+        results[name]=(arcs4gcode,remain2FillPercent)
+        if arcs4gcode is None:
+            log(f"Benchmark layer {layernumber}, engine {name}: no start possible, {dt:.2f}s")
+        else:
+            log(f"Benchmark layer {layernumber}, engine {name}: {100-remain2FillPercent:.1f}% filled, {len(arcs4gcode)} arcs, {dt:.2f}s")
+    return results[engine]
+
+def generateArcsExact(poly:Polygon,startLineString:LineString,boundaryWithOutStartLine:LineString,parameters:dict,layernumber:int=-1)->tuple:
+    """Fill the poly with arcs using exact polygon boolean operations. Returns the arcs for the gcode and the remaining unfilled area in percent, or None,None if no start was possible."""
+    #make parameters more readable
+    MaxDistanceFromPerimeter=parameters.get("MaxDistanceFromPerimeter") # how much 'bumpiness' you accept in the outline. Lower will generate more small arcs to follow the perimeter better (corners!). Good practice: 2 perimeters+ threshold of 2width=minimal exact touching (if rMin satisfied)
+    rMax=parameters.get("RMax",15)
+    pointsPerCircle=parameters.get("PointsPerCircle",80)
+    arcWidth=parameters.get("ArcWidth")
+    rMin=parameters.get("ArcCenterOffset")+arcWidth/1.5
+    rMinStart=parameters.get("nozzle_diameter")
+    #initialize
+    finalarcs=[]
+    arcs=[]
+    arcs4gcode=[]
+    remainingSpace=poly
+    budget=parameters.get("TimeBudget") or TimeBudget()
+    #first step in Arc Generation
+    startpt,concentricArcs=findStartPt(startLineString,boundaryWithOutStartLine,rMinStart,rMax,
+        lambda pt,maxArcs:generateMultipleConcentricArcs(pt,rMinStart,rMax,boundaryWithOutStartLine,remainingSpace,parameters,maxArcs),parameters,layernumber)
+    if budget.isExhausted():
+        return None,None
+    if startpt is None:        
+        logger.warning("Initialization Error: no concentric Arc could be generated at startpoints, moving on")
+        return None,None
+    concentricArcs+=generateMultipleConcentricArcs(startpt,concentricArcs[-1].r+arcWidth,rMax,boundaryWithOutStartLine,remainingSpace,parameters)#continue up to rMax
+    if budget.isExhausted():
+        return None,None
+    arcBoundarys=tagArcGroup(getArcBoundarys(concentricArcs),len(finalarcs),-1)
+    finalarcs.append(concentricArcs[-1]) 
+    for arc in concentricArcs: 
+        parameters=budget.degrade(parameters)
+        if budget.isExhausted():
+            return None,None
+        remainingSpace=remainingSpace.difference(arc.poly.buffer(1e-2))
+        arcs.append(arc)
+        if arc is not finalarcs[-1]:
+            arc.releasePoly()# only the outermost arc is needed for seeding
+    for arcboundary in arcBoundarys:    
+        arcs4gcode.append(arcboundary)
+
+    #start bfs (breadth first search algorithm) to fill the remainingspace
+    idx=0
+    if parameters.get("ArcSeedingEngine")=="distancefield":
+        remainingSpace=seedArcsFromDistanceField(poly,remainingSpace,finalarcs,arcs,arcs4gcode,rMin,rMax,parameters)
+        idx=len(finalarcs) # already filled, skip the bfs
+        if budget.isExhausted():
+            return None,None
+    safetyBreak=0
+    triedFixing=False
+    while idx<len(finalarcs):
+        parameters=budget.degrade(parameters)
+        if budget.isExhausted():
+            return None,None
+        MaxDistanceFromPerimeter=parameters.get("MaxDistanceFromPerimeter")
+        logger.debug(f"while executed: {idx} {len(finalarcs)}")
+        curArc=finalarcs[idx]
+        if curArc.poly.geom_type=="MultiPolygon":
+            farthestPointOnArc,longestDistance,NearestPointOnPoly=get_farthest_point(curArc.poly.geoms[0],poly,remainingSpace)
+        else:
+            farthestPointOnArc,longestDistance,NearestPointOnPoly=get_farthest_point(curArc.poly,poly,remainingSpace)
+        if not farthestPointOnArc or longestDistance<MaxDistanceFromPerimeter:#no more pts on arc
+            idx+=1 #go to next arc
+            continue
+        startpt=move_toward_point(farthestPointOnArc,curArc.center,parameters.get("ArcCenterOffset",2))
+        concentricArcs=generateMultipleConcentricArcs(startpt,rMin,rMax,poly.boundary,remainingSpace,parameters)
+        arcBoundarys=tagArcGroup(getArcBoundarys(concentricArcs),len(finalarcs),idx)
+        #log(f"number of concentric arcs generated:",len(concentricArcs))
+        if len(concentricArcs)>0:
+            for arc in concentricArcs: 
+                parameters=budget.degrade(parameters)
+                if budget.isExhausted():
+                    return None,None
+                remainingSpace=remainingSpace.difference(arc.poly.buffer(1e-2))
+                arcs.append(arc)
+                if arc is not concentricArcs[-1]:
+                    arc.releasePoly()# only the outermost arc is needed for seeding
+            finalarcs.append(concentricArcs[-1])
+            for arcboundary in arcBoundarys:    
+                arcs4gcode.append(arcboundary)
+        else:
+            idx+=1 # no possible concentric arcs found= arc complete, proceed to next
+        safetyBreak+=1
+        if safetyBreak>parameters.get("SafetyBreak_MaxArcNumber",2000):
+            break
+        if parameters.get("plotArcsEachStep"):
+            plt.title(f"Iteration {idx}, Total No Start Points: {len(finalarcs)}, Total No Arcs: {len(arcs)}")
+            plot_geometry(startLineString,'r')
+            plot_geometry([arc.getLineString() for arc in arcs4gcode],changecolor=True)
+            plot_geometry(remainingSpace,'g',filled=True)
+            plot_geometry(startpt,"r")
+            plt.axis('square')
+            plt.show()
+            
+        if len(finalarcs)==1 and idx==1 and remainingSpace.area/poly.area*100>50 and not triedFixing:
+            #error handling: the arc-generation got stuck at a thight spot during startup. Automated fix:
+            parameters["ArcCenterOffset"]=0
+            rMin=arcWidth/1.5
+            idx=0
+            triedFixing=True
+            log("the arc-generation got stuck at a thight spot during startup. Used Automated fix:set ArcCenterOffset to 0")
+        if triedFixing and len(finalarcs)==1 and idx==1:
+            log("fix did not work.")    
+    #poly finished
+    remain2FillPercent=remainingSpace.area/poly.area*100
+    if parameters.get("plotArcsFinal"):
+        plt.title(f"Iteration {idx}, Total No Start Points: {len(finalarcs)}, Total No Arcs: {len(arcs)}")
+        plot_geometry(startLineString,'r')
+        plot_geometry([arc.getLineString() for arc in arcs4gcode],changecolor=True)
+        plot_geometry(remainingSpace,'g',filled=True)
+        plot_geometry(startpt,"r")
+        plt.axis('square')
+        plt.show()
+    return arcs4gcode,remain2FillPercent
+
+def generateArcsRaster(poly:Polygon,startLineString:LineString,boundaryWithOutStartLine:LineString,parameters:dict,layernumber:int=-1)->tuple:
+    """
+    Fill the poly with arcs on an occupancy grid instead of polygon boolean operations. The concentric arcs are stamped as annuli into the grid,
+    the runs of free cells on each annulus are converted back into exact circle segments for the gcode.
+    The next center is chosen like in seedArcsFromDistanceField. Returns the arcs for the gcode and the remaining unfilled area in percent, or None,None if no start was possible.
+    """
+    maxDistanceFromPerimeter=parameters.get("MaxDistanceFromPerimeter")
+    arcWidth=parameters.get("ArcWidth")
+    rMax=parameters.get("RMax",15)
+    rMin=parameters.get("ArcCenterOffset")+arcWidth/1.5
+    rMinStart=parameters.get("nozzle_diameter")
+    budget=parameters.get("TimeBudget") or TimeBudget()
+    grid=DistanceField(poly,arcWidth*parameters.get("RasterResolution",0.25),budget)
+    parameters=budget.degrade(parameters)
+    if budget.isExhausted():
+        return None,None
+    def getRStop(center:Point,boundary)->float:
+        if parameters.get("UseLeastAmountOfCenterPoints",False):
+            return rMax
+        return min(rMax,center.distance(boundary)-1e-6)#stop before touching the boundary, like generateMultipleConcentricArcs
+    #first step in Arc Generation
+    arcs4gcode=[]
+    startpt,arclines=findStartPt(startLineString,boundaryWithOutStartLine,rMinStart,rMax,
+        lambda pt,maxArcs:grid.stampConcentricArcs(pt,rMinStart,min(getRStop(pt,boundaryWithOutStartLine),rMinStart+(maxArcs-1)*arcWidth),arcWidth,parameters,markFilled=False)[0],parameters,layernumber)
+    if budget.isExhausted():
+        return None,None
+    if startpt is None:
+        logger.warning("Initialization Error: no concentric Arc could be generated at startpoints, moving on")
+        return None,None
+    arclines,rimCells=grid.stampConcentricArcs(startpt,rMinStart,getRStop(startpt,boundaryWithOutStartLine),arcWidth,parameters)
+    if budget.isExhausted():
+        return None,None
+    arcs4gcode.extend(tagArcGroup(arclines,0,-1))
+    centers=[startpt]
+    rims=[rimCells]
+    candidates=[]# heap of (-distance,idx of center,cell)
+    def pushCandidate(idc:int)->None:
+        cell,d=grid.getFarthestCell(rims[idc])
+        if cell is not None and d>=maxDistanceFromPerimeter:
+            heapq.heappush(candidates,(-d,idc,cell))
+    pushCandidate(0)
+    safetyBreak=0
+    while candidates:
+        parameters=budget.degrade(parameters)
+        if budget.isExhausted():
+            return None,None
+        maxDistanceFromPerimeter=parameters.get("MaxDistanceFromPerimeter")
+        negDist,idc,cell=heapq.heappop(candidates)
+        cell,d=grid.getFarthestCell(rims[idc])
+        if cell is None or d<maxDistanceFromPerimeter:
+            continue
+        if d< -negDist-1e-6:
+            heapq.heappush(candidates,(-d,idc,cell))
+            continue
+        p=grid.cellCenter(cell)
+        startpt=move_toward_point(p,centers[idc],parameters.get("ArcCenterOffset",2))
+        arclines,rimCells=grid.stampConcentricArcs(startpt,rMin,getRStop(startpt,poly.boundary),arcWidth,parameters)
+        if budget.isExhausted():
+            return None,None
+        if arclines:
+            arcs4gcode.extend(tagArcGroup(arclines,len(centers),idc))
+            centers.append(startpt)
+            rims.append(rimCells)
+            pushCandidate(len(centers)-1)
+        else:
+            grid.markFilled(p.buffer(arcWidth))#unusable spot, dont try again
+        pushCandidate(idc)
+        safetyBreak+=1
+        if safetyBreak>parameters.get("SafetyBreak_MaxArcNumber",2000):
+            break
+    remain2FillPercent=np.count_nonzero(grid.free)/max(np.count_nonzero(grid.inside),1)*100
+    if parameters.get("plotArcsFinal"):
+        plt.title(f"Raster engine, Total No Start Points: {len(centers)}, Total No Arcs: {len(arcs4gcode)}")
+        plt.imshow(grid.free,origin="lower",extent=(grid.xs[0],grid.xs[-1],grid.ys[0],grid.ys[-1]),cmap="Greens",alpha=0.5)
+        plot_geometry(startLineString,'r')
+        plot_geometry([arc.getLineString() for arc in arcs4gcode],changecolor=True)
+        plt.axis('square')
+        plt.show()
+    return arcs4gcode,remain2FillPercent
+
+def seedArcsFromDistanceField(poly:Polygon,remainingSpace:Polygon,finalarcs:list,arcs:list,arcs4gcode:list,rMin:float,rMax:float,kwargs:dict={})->Polygon:
+    """
+    Alternative to the bfs in generateArcsExact(). Instead of walking the arcs in generation order, always continue at the free spot
+    that is farthest away from the perimeter, no matter on which arc it lies. The distances are looked up in a distance field computed once for the whole polygon.
+    finalarcs,arcs and arcs4gcode are extended in place, returns the remaining space.
+    """
+    maxDistanceFromPerimeter=kwargs.get("MaxDistanceFromPerimeter")
+    budget=kwargs.get("TimeBudget") or TimeBudget()
+    field=DistanceField(poly,kwargs.get("ArcWidth")*kwargs.get("DistanceFieldResolution",0.5),budget)
+    kwargs=budget.degrade(kwargs)
+    if budget.isExhausted():
+        return remainingSpace
+    for arc in finalarcs:
+        field.markFilled(arc.poly.buffer(1e-2))
+    candidates=[]# heap of (-distance,idx of arc in finalarcs,point)
+    def pushCandidate(ida:int)->None:
+        p,d=field.getFarthestPoint(finalarcs[ida].poly)
+        if p and d>=maxDistanceFromPerimeter:
+            heapq.heappush(candidates,(-d,ida,p))
+    for ida in range(len(finalarcs)):
+        pushCandidate(ida)
+    safetyBreak=0
+    while candidates:
+        kwargs=budget.degrade(kwargs)
+        if budget.isExhausted():
+            break
+        maxDistanceFromPerimeter=kwargs.get("MaxDistanceFromPerimeter")
+        negDist,ida,p=heapq.heappop(candidates)
+        p,d=field.getFarthestPoint(finalarcs[ida].poly)#the spot might have been filled by now
+        if not p or d<maxDistanceFromPerimeter:
+            continue
+        if d< -negDist-1e-6:#outdated, maybe a different arc has a better spot now
+            heapq.heappush(candidates,(-d,ida,p))
+            continue
+        curArc=finalarcs[ida]
+        startpt=move_toward_point(p,curArc.center,kwargs.get("ArcCenterOffset",2))
+        concentricArcs=generateMultipleConcentricArcs(startpt,rMin,rMax,poly.boundary,remainingSpace,kwargs)
+        if len(concentricArcs)>0 and not concentricArcs[-1].poly.is_empty:
+            #the concentric arcs are nested, the outermost one covers all others
+            remainingSpace=remainingSpace.difference(concentricArcs[-1].poly.buffer(1e-2))
+            field.markFilled(concentricArcs[-1].poly.buffer(1e-2))
+            arcs.extend(concentricArcs)
+            finalarcs.append(concentricArcs[-1])
+            arcs4gcode.extend(tagArcGroup(getArcBoundarys(concentricArcs),len(finalarcs)-1,ida))
+            for arc in concentricArcs[:-1]:
+                arc.releasePoly()# only the outermost arc is needed for seeding
+            pushCandidate(len(finalarcs)-1)
+            pushCandidate(ida)
+        else:
+            field.markFilled(startpt.buffer(rMax))#not even the largest arc reaches the remaining space, everything around is filled
+            pushCandidate(ida)
+        safetyBreak+=1
+        if safetyBreak>kwargs.get("SafetyBreak_MaxArcNumber",2000):
+            break
+    return remainingSpace
+
+def generateMultipleConcentricArcs(startpt:Point,rMin:float,rMax:float, boundaryLineString:LineString,remainingSpace:Polygon,kwargs={},maxArcs:int=None)->list:
     arcs=[]
     r=rMin
-    while r<=rMax:
+    budget=kwargs.get("TimeBudget") or TimeBudget()
+    while r<=rMax and (maxArcs is None or len(arcs)<maxArcs):
+        kwargs=budget.degrade(kwargs)
+        if budget.isExhausted():
+            break
         arcObj=Arc(startpt,r,kwargs=kwargs)
         arc=arcObj.generateConcentricArc(startpt,remainingSpace)
         if arc.intersects(boundaryLineString) and not kwargs.get("UseLeastAmountOfCenterPoints",False):
             break
         arcs.append(arcObj)
-        #print("True Arc type:",type(arc4gcode))
+        #log("True Arc type:",type(arc4gcode))
         r+=kwargs.get("ArcWidth")
     return arcs
 
+################################# HELPER FUNCTIONS Travel Optimization #################################
+########################################################################################################
+
+def tagArcGroup(arcs:list,group:int,parentGroup:int)->list:
+    """Remember which arcs were generated around the same center and from which group the center was chosen. Used to keep the print order valid when optimizing the travel."""
+    for arc in arcs:
+        arc.group=group
+        arc.parentGroup=parentGroup
+    return arcs
+
+def getArcEnds(arc)->tuple:
+    """Start and end of an arc for travel calculations, the center for empty arcs."""
+    if len(arc.arcline)==0:
+        return (arc.center.x,arc.center.y),(arc.center.x,arc.center.y)
+    return arc.arcline[0],arc.arcline[-1]
+
+def getTravelDistance(starts:np.ndarray,ends:np.ndarray)->float:
+    """Sum of the travel moves from the end of each path to the start of the next one."""
+    if len(starts)<2:
+        return 0
+    return float(np.hypot(*(starts[1:]-ends[:-1]).T).sum())
+
+def orderNearestNeighbour(starts:np.ndarray,ends:np.ndarray,parents:np.ndarray)->np.ndarray:
+    """Greedy tour: always continue with the closest path whose parent is already printed. Paths without parent (-1) can start any time, the tour begins with the first one."""
+    n=len(starts)
+    done=np.zeros(n,dtype=bool)
+    available=parents<0
+    order=[]
+    pos=None
+    while len(order)<n:
+        cand=np.nonzero(available&~done)[0]
+        if pos is None:
+            nxt=cand[0]
+        else:
+            nxt=cand[np.argmin(np.hypot(*(starts[cand]-pos).T))]
+        order.append(nxt)
+        done[nxt]=True
+        available|=parents==nxt
+        pos=ends[nxt]
+    return np.array(order)
+
+def improveOrderTwoOpt(order:np.ndarray,starts:np.ndarray,ends:np.ndarray,parents:np.ndarray,maxPasses:int=10)->np.ndarray:
+    """
+    2-opt on a tour of directed paths: reverse the visiting order of a section if that shortens the travel. The paths keep their direction,
+    sections containing a path and its parent are never reversed. Costs of all section ends for one section start are evaluated at once with prefix sums.
+    """
+    order=order.copy()
+    n=len(order)
+    def prepare():
+        s=starts[order]
+        e=ends[order]
+        pos=np.empty(n,dtype=int)
+        pos[order]=np.arange(n)
+        parentPos=np.where(parents[order]>=0,pos[np.maximum(parents[order],0)],-1)
+        forward=np.concatenate(([0],np.cumsum(np.hypot(*(s[1:]-e[:-1]).T))))
+        backward=np.concatenate(([0],np.cumsum(np.hypot(*(s[:-1]-e[1:]).T))))
+        return s,e,parentPos,forward,backward
+    for _ in range(maxPasses):
+        improved=False
+        s,e,parentPos,forward,backward=prepare()
+        for i in range(1,n-1):
+            blocked=np.nonzero(parentPos[i+1:]>=i)[0]
+            jMax=i+blocked[0] if len(blocked) else n-1
+            if jMax<=i:
+                continue
+            j=np.arange(i+1,jMax+1)
+            hasNext=j<n-1
+            jNext=np.minimum(j+1,n-1)
+            old=np.hypot(*(s[i]-e[i-1]))+forward[j]-forward[i]+np.where(hasNext,np.hypot(*(s[jNext]-e[j]).T),0)
+            new=np.hypot(*(s[j]-e[i-1]).T)+backward[j]-backward[i]+np.where(hasNext,np.hypot(*(s[jNext]-e[i]).T),0)
+            best=np.argmin(new-old)
+            if new[best]-old[best]<-1e-6:
+                order[i:j[best]+1]=order[i:j[best]+1][::-1]
+                s,e,parentPos,forward,backward=prepare()
+                improved=True
+        if not improved:
+            break
+    return order
+
+def orderArcs4GCode(arcs4gcode:list,kwargs:dict={})->list:
+    """
+    Reorder the groups of concentric arcs to shorten the travel between them. A group is printed only after the group its center was chosen from,
+    the arcs inside a group keep their order (inner to outer).
+    """
+    groups={}
+    for arc in arcs4gcode:
+        groups.setdefault(getattr(arc,"group",0),[]).append(arc)
+    if len(groups)<3:
+        return arcs4gcode
+    groupIds=list(groups)
+    idx={g:i for i,g in enumerate(groupIds)}
+    starts=np.array([getArcEnds(groups[g][0])[0] for g in groupIds])
+    ends=np.array([getArcEnds(groups[g][-1])[1] for g in groupIds])
+    parents=np.array([idx.get(getattr(groups[g][0],"parentGroup",-1),-1) for g in groupIds])
+    order=orderNearestNeighbour(starts,ends,parents)
+    order=improveOrderTwoOpt(order,starts,ends,parents,kwargs.get("TravelOptimizationPasses",10))
+    orderedArcs=[arc for i in order for arc in groups[groupIds[i]]]
+    if kwargs.get("RunSummary"):
+        before=np.array([getArcEnds(arc) for arc in arcs4gcode])
+        after=np.array([getArcEnds(arc) for arc in orderedArcs])
+        kwargs.get("RunSummary").count("Arc travel before ordering [mm]",getTravelDistance(before[:,0],before[:,1]))
+        kwargs.get("RunSummary").count("Arc travel after ordering [mm]",getTravelDistance(after[:,0],after[:,1]))
+    return orderedArcs
+
+def orderHilbertChunks(chunks:list,kwargs:dict={})->list:
+    """
+    Print order of the hilbert chunks. To prevent local overheating the next chunk is the closest one that is at least HilbertMinChunkDistance
+    away from the last chunk, the farthest one if there is none.
+    """
+    if len(chunks)<3:
+        return chunks
+    minDistance=kwargs.get("HilbertMinChunkDistance",10)
+    starts=np.array([[c[0].x,c[0].y] for c in chunks])
+    ends=np.array([[c[-1].x,c[-1].y] for c in chunks])
+    centers=np.array([np.mean([[p.x,p.y] for p in c],axis=0) for c in chunks])
+    remaining=np.ones(len(chunks),dtype=bool)
+    remaining[0]=False
+    order=[0]
+    while remaining.any():
+        cand=np.nonzero(remaining)[0]
+        last=order[-1]
+        spacing=np.hypot(*(centers[cand]-centers[last]).T)
+        farEnough=spacing>=minDistance
+        if farEnough.any():
+            cand=cand[farEnough]
+            nxt=cand[np.argmin(np.hypot(*(starts[cand]-ends[last]).T))]
+        else:
+            nxt=cand[np.argmax(spacing)]
+        order.append(nxt)
+        remaining[nxt]=False
+    if kwargs.get("RunSummary"):
+        shuffled=list(range(len(chunks)))# the former order: random
+        random.Random(0).shuffle(shuffled)
+        kwargs.get("RunSummary").count("Hilbert travel random order [mm]",getTravelDistance(starts[shuffled],ends[shuffled]))
+        kwargs.get("RunSummary").count("Hilbert travel after ordering [mm]",getTravelDistance(starts[order],ends[order]))
+    return [chunks[i] for i in order]
+
+################################# HELPER FUNCTIONS Distance Field #################################
+################################################################################################### 
+
+def distanceTransform(mask:np.ndarray,budget:"TimeBudget"=None)->np.ndarray:
+    """
+    Exact euclidean distance (unit: cells) of every True cell to the closest False cell. The border of the mask has to be False.
+    With a budget the second pass stops early once the time is used up, the distances are then too large and the caller has to give up.
+    """
+    rows=np.broadcast_to(np.arange(mask.shape[0])[:,None],mask.shape)
+    #first pass: distance along the columns
+    above=np.maximum.accumulate(np.where(mask,-mask.shape[0],rows),axis=0)
+    below=np.minimum.accumulate(np.where(mask,2*mask.shape[0],rows)[::-1],axis=0)[::-1]
+    g2=np.minimum(rows-above,below-rows).astype(float)**2
+    #second pass: combine along the rows, offsets larger than the biggest distance found can not improve anything.
+    d2=g2.copy()
+    dk=1
+    while dk<mask.shape[1] and dk*dk<d2.max():
+        if budget is not None and budget.seconds and budget.elapsed()>=budget.seconds:
+            break
+        d2[:,dk:]=np.minimum(d2[:,dk:],g2[:,:-dk]+dk*dk)
+        d2[:,:-dk]=np.minimum(d2[:,:-dk],g2[:,dk:]+dk*dk)
+        dk+=1
+    return np.sqrt(d2)
+
+class RasterGrid():
+    """Rasterized polygon: cell centers inside the polygon and which of them are not filled yet."""
+    def __init__(self,poly:Polygon,cellSize:float)->None:
+        minX, minY, maxX, maxY=poly.bounds
+        self.cellSize=cellSize
+        self.x0=minX-cellSize # one empty cell around the polygon
+        self.y0=minY-cellSize
+        nx=int(np.ceil((maxX-minX)/cellSize))+3
+        ny=int(np.ceil((maxY-minY)/cellSize))+3
+        self.xs=self.x0+np.arange(nx)*cellSize
+        self.ys=self.y0+np.arange(ny)*cellSize
+        x,y=np.meshgrid(self.xs,self.ys)
+        self.inside=shapely.contains_xy(poly,x,y)
+        self.free=self.inside.copy()
+    def cellIndex(self,coords:np.ndarray)->tuple:
+        ix=np.clip(np.rint((coords[:,0]-self.x0)/self.cellSize).astype(int),0,len(self.xs)-1)
+        iy=np.clip(np.rint((coords[:,1]-self.y0)/self.cellSize).astype(int),0,len(self.ys)-1)
+        return iy,ix
+    def cellCenter(self,cell:int)->Point:
+        iy,ix=np.unravel_index(cell,self.free.shape)
+        return Point(self.xs[ix],self.ys[iy])
+    def markFilled(self,geom)->None:
+        if geom.is_empty:
+            return
+        minX, minY, maxX, maxY=geom.bounds
+        (iy0,iy1),(ix0,ix1)=self.cellIndex(np.array([[minX,minY],[maxX,maxY]]))
+        x,y=np.meshgrid(self.xs[ix0:ix1+1],self.ys[iy0:iy1+1])
+        self.free[iy0:iy1+1,ix0:ix1+1]&=~shapely.contains_xy(geom,x,y)
+    def isFree(self,coords:np.ndarray)->np.ndarray:
+        """True if the cell of the point or any neighbouring cell is free. Points on arcs lie exactly between filled and free cells."""
+        iy,ix=self.cellIndex(coords)
+        free=np.zeros(len(coords),dtype=bool)
+        for dy in (-1,0,1):
+            for dx in (-1,0,1):
+                free|=self.free[np.clip(iy+dy,0,len(self.ys)-1),np.clip(ix+dx,0,len(self.xs)-1)]
+        return free
+    def stampConcentricArcs(self,center:Point,rStart:float,rStop:float,arcWidth:float,kwargs:dict={},markFilled:bool=True)->tuple:
+        """
+        Stamp the concentric arcs rStart, rStart+arcWidth,...<=rStop around center into the free cells and mark the covered disk as filled (if markFilled).
+        Returns the arcs, one per run of free cells on each annulus, and the flat indices of the free cells along the outer rim.
+        """
+        if rStop<rStart:
+            return [],np.empty(0,dtype=int)
+        radii=np.arange(rStart,rStop+1e-9,arcWidth)
+        rOuter=radii[-1]+2*self.cellSize
+        (iy0,iy1),(ix0,ix1)=self.cellIndex(np.array([[center.x-rOuter,center.y-rOuter],[center.x+rOuter,center.y+rOuter]]))
+        window=self.free[iy0:iy1+1,ix0:ix1+1]# view, changes apply to self.free
+        iy,ix=np.nonzero(window)
+        dx=self.xs[ix0+ix]-center.x
+        dy=self.ys[iy0+iy]-center.y
+        d=np.hypot(dx,dy)
+        #annuli, a band of +-1 cell around each radius has no gaps
+        k=np.rint((d-rStart)/arcWidth).astype(int)
+        onArc=(k>=0)&(k<len(radii))&(np.abs(d-rStart-k*arcWidth)<=self.cellSize)
+        theta=np.arctan2(dy[onArc],dx[onArc])
+        k=k[onArc]
+        order=np.lexsort((theta,k))
+        theta=theta[order]
+        k=k[order]
+        arclines=[]
+        budget=kwargs.get("TimeBudget") or TimeBudget()
+        for ring in np.split(np.arange(len(k)),np.nonzero(np.diff(k))[0]+1):
+            kwargs=budget.degrade(kwargs)
+            if budget.isExhausted():
+                break # the caller gives up the polygon
+            if len(ring)<2:
+                continue
+            r=radii[k[ring[0]]]
+            arclines.extend(self.makeArcRuns(center,r,theta[ring],kwargs))
+        rim=(d>radii[-1])&(d<=radii[-1]+1.5*self.cellSize)
+        rimCells=np.ravel_multi_index((iy0+iy[rim],ix0+ix[rim]),self.free.shape)
+        if markFilled:
+            filled=d<=radii[-1]
+            window[iy[filled],ix[filled]]=False
+        return arclines,rimCells
+    def makeArcRuns(self,center:Point,r:float,theta:np.ndarray,kwargs:dict={})->list:
+        """Split the sorted angles of the cells on one annulus at gaps and turn each run into a circle segment."""
+        maxGap=3*self.cellSize/r
+        gaps=np.diff(np.append(theta,theta[0]+2*np.pi))
+        cuts=np.nonzero(gaps>maxGap)[0]
+        if len(cuts)==0:#full circle
+            runs=[(theta[0],theta[0]+2*np.pi)]
+        else:
+            starts=theta[(cuts+1)%len(theta)]
+            ends=theta[np.roll(cuts,-1)]
+            runs=[(a0,a1 if a1>=a0 else a1+2*np.pi) for a0,a1 in zip(starts,ends)]
+        pointsPerCircle=getPointsPerCircle(r,kwargs)
+        arcs=[]
+        for a0,a1 in runs:
+            if (a1-a0)*r<self.cellSize:
+                continue
+            angles=np.linspace(a0,a1,max(2,int(np.ceil((a1-a0)/(2*np.pi)*pointsPerCircle))+1))
+            arc=Arc(center,r,kwargs)
+            arc.arcline=np.column_stack((center.x+r*np.cos(angles),center.y+r*np.sin(angles)))
+            arcs.append(arc)
+        return arcs
+
+class DistanceField(RasterGrid):
+    """RasterGrid that additionally stores for each cell the distance to the perimeter."""
+    def __init__(self,poly:Polygon,cellSize:float,budget:"TimeBudget"=None)->None:
+        super().__init__(poly,cellSize)
+        self.dist=np.clip(distanceTransform(self.inside,budget)-0.5,0,None)*cellSize # cell centers->perimeter
+    def getFarthestPoint(self,arc:Polygon)->tuple:
+        """Same as get_farthest_point, but with the distances looked up in the field. Returns the point and its distance or None,None."""
+        if arc.geom_type=="MultiPolygon":
+            arc=arc.geoms[0]
+        if arc.is_empty or arc.geom_type!="Polygon":
+            return None,None
+        coords=np.asarray(arc.exterior.coords)
+        iy,ix=self.cellIndex(coords)
+        dist=np.where(self.isFree(coords),self.dist[iy,ix],-1)
+        idx=np.argmax(dist)
+        if dist[idx]<0:
+            return None,None
+        return Point(coords[idx]),dist[idx]
+    def getFarthestCell(self,cells:np.ndarray)->tuple:
+        """Free cell out of the flat cell indices that is farthest away from the perimeter. Returns the cell and its distance or None,None."""
+        cells=cells[self.free.flat[cells]]
+        if len(cells)==0:
+            return None,None
+        dist=self.dist.flat[cells]
+        idx=np.argmax(dist)
+        return int(cells[idx]),dist[idx]
+
 ################################# HELPER FUNCTIONS Arc Validation #################################
 ################################################################################################### 
 
@@ -1036,21 +2707,21 @@ def plot_geometry(geometry, color='black', linewidth=1,**kwargs):
         for polygon in geometry.geoms:
             plot_geometry(polygon,color=color,linewidth=linewidth,kwargs=kwargs)
     else:
-        print('Unhandled geometry type: ' + geometry.geom_type)
+        log('Unhandled geometry type: ' + geometry.geom_type)
 
 ################################# HELPER FUNCTIONS Arc->GCode #################################
 ############################################################################################### 
 
 def getArcBoundarys(concentricArcs:list)->list:
-    '''Handle arcs composited from multiple parts'''
+    '''Handle arcs composited from multiple parts. Returns one Arc per arcline, center and radius are kept for the gcode.'''
     boundarys=[]
     for arc in concentricArcs:
         arcLine=arc.extractArcBoundary()
         if type(arcLine)==type([]):
             for arc in arcLine:
-                boundarys.append(arc.arcline)
+                boundarys.append(arc)
         else:
-            boundarys.append(arcLine)
+            boundarys.append(arc)
     return boundarys                
 
 def readSettingsFromGCode2dict(gcodeLines:list,fallbackValuesDict:dict)->dict:
@@ -1069,9 +2740,9 @@ def readSettingsFromGCode2dict(gcodeLines:list,fallbackValuesDict:dict)->dict:
                     gCodeSettingDict[setting[0].strip(" ")]=setting[1] # leave the complex settings as strings. They shall be handled individually if necessary 
             elif len(setting)>2:
                 gCodeSettingDict[setting[0].strip(" ")]=setting[1:]
-                warnings.warn(f"PrusaSlicer Setting {setting[0]} not in the expected key/value format, but added into the settings-dictionarry")
+                logger.warning(f"PrusaSlicer Setting {setting[0]} not in the expected key/value format, but added into the settings-dictionarry")
             else:    
-                print("Could not read setting from PrusaSlicer:",setting)
+                log("Could not read setting from PrusaSlicer:",setting)
     if "%" in str(gCodeSettingDict.get("perimeter_extrusion_width")) : #overwrite Percentage width as suggested by 5axes via github                
         gCodeSettingDict["perimeter_extrusion_width"]=gCodeSettingDict.get("nozzle_diameter")*(float(gCodeSettingDict.get("perimeter_extrusion_width").strip("%"))/100)
     isWarned=False    
@@ -1079,32 +2750,32 @@ def readSettingsFromGCode2dict(gcodeLines:list,fallbackValuesDict:dict)->dict:
         if isinstance(val,tuple) :
             if gCodeSettingDict.get("Fallback_"+key):
                 gCodeSettingDict[key]=gCodeSettingDict.get("Fallback_"+key)
-                #warnings.warn(f"{key}: Fallback value used: {gCodeSettingDict.get(key)}")
+                #logger.warning(f"{key}: Fallback value used: {gCodeSettingDict.get(key)}")
             else:
                 gCodeSettingDict[key]=val[0]    
                 if not isWarned:
-                    warnings.warn(f"{key} was specified as tuple/list, this is normal for using multiple extruders. For all list values First values will be used. If unhappy: Add manual fallback value by searching for ADD FALLBACK in the code. And add 'Fallback_<key>:<yourValue>' into the dictionary.")
+                    logger.warning(f"{key} was specified as tuple/list, this is normal for using multiple extruders. For all list values First values will be used. If unhappy: Add manual fallback value by searching for ADD FALLBACK in the code. And add 'Fallback_<key>:<yourValue>' into the dictionary.")
                     isWarned=True
     return gCodeSettingDict
 
 def checkforNecesarrySettings(gCodeSettingDict:dict)->bool:
     if not gCodeSettingDict.get("use_relative_e_distances"):
-        warnings.warn("Script only works with relative e-distances enabled in PrusaSlicer. Change acordingly.")
+        logger.warning("Script only works with relative e-distances enabled in PrusaSlicer. Change acordingly.")
         return False
     if gCodeSettingDict.get("extrusion_width")<0.001 or gCodeSettingDict.get("perimeter_extrusion_width")<0.001 or gCodeSettingDict.get("solid_infill_extrusion_width")<0.001:
-        warnings.warn("Script only works with extrusion_width and perimeter_extrusion_width and solid_infill_extrusion_width>0. Change in PrusaSlicer acordingly.")
+        logger.warning("Script only works with extrusion_width and perimeter_extrusion_width and solid_infill_extrusion_width>0. Change in PrusaSlicer acordingly.")
         return False    
     if not gCodeSettingDict.get("overhangs"):
-        warnings.warn("Overhang detection disabled in PrusaSlicer. Activate in PrusaSlicer for script success!")
+        logger.warning("Overhang detection disabled in PrusaSlicer. Activate in PrusaSlicer for script success!")
         return False
     if gCodeSettingDict.get("bridge_speed")>5:
-        warnings.warn(f"Your Bridging Speed is set to {gCodeSettingDict.get('bridge_speed'):.0f} mm/s in PrusaSlicer. This can cause problems with warping.<=5mm/s is recommended")        
+        logger.warning(f"Your Bridging Speed is set to {gCodeSettingDict.get('bridge_speed'):.0f} mm/s in PrusaSlicer. This can cause problems with warping.<=5mm/s is recommended")        
     if gCodeSettingDict.get("infill_first"):
-        warnings.warn("Infill set in PrusaSlicer to be printed before perimeter. This can cause problems with the script.")
+        logger.warning("Infill set in PrusaSlicer to be printed before perimeter. This can cause problems with the script.")
     if gCodeSettingDict.get("external_perimeters_first"):
-        warnings.warn("PrusaSlicer-Setting: External perimeter is printed before inner perimeters. Change for better overhang performance. ")
+        logger.warning("PrusaSlicer-Setting: External perimeter is printed before inner perimeters. Change for better overhang performance. ")
     if not gCodeSettingDict.get("avoid_crossing_perimeters"):
-        warnings.warn("PrusaSlicer-Setting: Travel Moves may cross the outline and therefore cause artefacts in arc generation.")    
+        logger.warning("PrusaSlicer-Setting: Travel Moves may cross the outline and therefore cause artefacts in arc generation.")    
     return True
 def calcEStepsPerMM(settingsdict:dict,layerheight:float=None)->float:
     if layerheight:# case: printing on surface.
@@ -1135,39 +2806,157 @@ def retractGCode(retract:bool=True,kwargs:dict={})->str:
 def setFeedRateGCode(F:int)->str:
     return f"G1 F{F}\n"     
 
-def arc2GCode(arcline:LineString,eStepsPerMM:float,arcidx=None,kwargs={})->list:
+def arc2GCode(arcline:np.ndarray,eStepsPerMM:float,arcidx=None,kwargs={},center:Point=None,r:float=None)->list:
     GCodeLines=[]
     p1=None
-    pts=[Point(p) for p in arcline.coords]
-    if len(pts)<2:
+    if len(arcline)<2:
         return []
+    pts=[Point(p) for p in arcline.tolist()]
+    arclineLength=float(shapely.length(shapely.linestrings(arcline)))
     #plt.plot([p.x for p in pts],[p.y for p in pts])
     #plt.axis('square')
     #plt.show()      
     extDist=kwargs.get("ExtendArcDist",0.5)
     pExtend=move_toward_point(pts[-2],pts[-1],extDist)
-    arcPrintSpeed=np.clip(arcline.length/(kwargs.get("ArcSlowDownBelowThisDuration",3))*60,
+    useArcMoves=kwargs.get("ArcGCodeMode","G1")=="G2G3" and center is not None
+    if not useArcMoves and kwargs.get("ArcSimplifyTolerance",0)>0:
+        pts=[Point(p) for p in simplifyPolyline(arcline,kwargs.get("ArcSimplifyTolerance")).tolist()]
+    arcPrintSpeed=np.clip(arclineLength/(kwargs.get("ArcSlowDownBelowThisDuration",3))*60,
                             kwargs.get("ArcMinPrintSpeed",1*60),kwargs.get('ArcPrintSpeed',2*60)) # *60 bc unit conversion:mm/s=>mm/min
+    movePts=[]
     for idp,p in enumerate(pts):
         if idp==0:
             p1=p
-            GCodeLines.append(f";Arc {arcidx if arcidx else ' '} Length:{arcline.length}\n")
+            movePts.append(p)
+            GCodeLines.append(f";Arc {arcidx if arcidx else ' '} Length:{arclineLength}\n")
             GCodeLines.append(p2GCode(p,F=kwargs.get('ArcTravelFeedRate',100*60)))#feedrate is mm/min...
             GCodeLines.append(retractGCode(retract=False,kwargs=kwargs))
             GCodeLines.append(setFeedRateGCode(arcPrintSpeed))
         else:
             dist=p.distance(p1)
             if dist>kwargs.get("GCodeArcPtMinDist",0.1):
-                GCodeLines.append(p2GCode(p,E=dist*eStepsPerMM))
+                if not useArcMoves:
+                    GCodeLines.append(p2GCode(p,E=dist*eStepsPerMM))
+                movePts.append(p)
                 p1=p
         if idp==len(pts)-1:
+            if useArcMoves:
+                moves=circularMoves2GCode(movePts,center,r,eStepsPerMM,kwargs)
+                GCodeLines.extend(moves)
+                if kwargs.get("RunSummary"):
+                    kwargs.get("RunSummary").count("Arc moves",len(moves))
+                    kwargs.get("RunSummary").count("Arc moves without G2/G3",len(movePts)-1)
             GCodeLines.append(p2GCode(pExtend,E=extDist*eStepsPerMM))#extend arc tangentially for better bonding between arcs
             GCodeLines.append(retractGCode(retract=True,kwargs=kwargs))
     return GCodeLines        
 
+def getCircularRuns(pts:list,center:Point,r:float,tolerance:float)->tuple:
+    """
+    Label each segment of the polyline with the id of the circle segment it belongs to, -1 if the segment does not follow the circle (center,r).
+    A segment follows the circle if both ends are on it and the arc differs less than tolerance from the straight segment.
+    Runs are split when the direction changes or they get longer than half a circle. Returns the labels and the signed angle of each segment.
+    """
+    rel=np.array([[p.x-center.x,p.y-center.y] for p in pts])
+    onCircle=np.abs(np.hypot(rel[:,0],rel[:,1])-r)<=tolerance
+    dTheta=(np.diff(np.arctan2(rel[:,1],rel[:,0]))+np.pi)%(2*np.pi)-np.pi
+    isCircular=onCircle[:-1]&onCircle[1:]&(r*(1-np.cos(dTheta/2))<=tolerance)&(dTheta!=0)
+    runIds=np.full(len(dTheta),-1)
+    run=-1
+    span=0
+    for ids,dt in enumerate(dTheta):
+        if not isCircular[ids]:
+            span=0
+            continue
+        if span==0 or np.sign(dt)!=np.sign(span) or abs(span+dt)>np.pi or runIds[ids-1]<0:
+            run+=1
+            span=0
+        span+=dt
+        runIds[ids]=run
+    return runIds,dTheta
+
+def circularMoves2GCode(pts:list,center:Point,r:float,eStepsPerMM:float,kwargs:dict={})->list:
+    """Moves along the points, circle segments are merged into G2 (clockwise) / G3 (counterclockwise) with I/J relative to the segment start."""
+    tolerance=max(kwargs.get("ArcFitTolerance",0.02),r*(1-np.cos(np.pi/getPointsPerCircle(r,kwargs))))# the points come from a discretized circle
+    runIds,dTheta=getCircularRuns(pts,center,r,tolerance)
+    GCodeLines=[]
+    pos=pts[0]
+    span=0
+    for ids in range(len(runIds)):
+        p=pts[ids+1]
+        if runIds[ids]<0:
+            GCodeLines.append(p2GCode(p,E=p.distance(pos)*eStepsPerMM))
+            pos=p
+            continue
+        if span==0:
+            start=pos
+        span+=dTheta[ids]
+        if ids+1<len(runIds) and runIds[ids+1]==runIds[ids]:
+            continue
+        rStart=start.distance(center)# the points may lie on a chord: the end gets the same distance to the center as the start, else I/J and X/Y describe different circles
+        pos=move_toward_point(center,p,rStart)
+        cmd="G3" if span>0 else "G2"
+        GCodeLines.append(f"{cmd} X{pos.x:.3f} Y{pos.y:.3f} I{center.x-start.x:.4f} J{center.y-start.y:.4f} E{abs(span)*rStart*eStepsPerMM:.7f}\n")
+        span=0
+    return GCodeLines
+
+def simplifyPolyline(coords:np.ndarray,tolerance:float)->np.ndarray:
+    """Coordinates (n,2) of the polyline with points left out as long as it deviates less than tolerance, first and last point are kept."""
+    return shapely.get_coordinates(shapely.simplify(shapely.linestrings(coords),tolerance,preserve_topology=False))
+
+def getCollinearMask(coords:np.ndarray,tolerance:float=1e-6)->np.ndarray:
+    """True for the points (n,2) that start or end a straight run: the first and last point and every point where the direction changes."""
+    keep=np.ones(len(coords),dtype=bool)
+    if len(coords)<3:
+        return keep
+    d=np.diff(coords,axis=0)
+    cross=d[:-1,0]*d[1:,1]-d[:-1,1]*d[1:,0]
+    dot=np.einsum("ij,ij->i",d[:-1],d[1:])
+    keep[1:-1]=(np.abs(cross)>tolerance*np.hypot(d[1:,0],d[1:,1]))|(dot<=0)
+    return keep
+
+def getHilbertRunsInPoly(poly:Polygon,iterationCount:int,maxidx:int,toXY,leafLevel:int=3)->list:
+    """
+    Index ranges [start,end) of the hilbert curve with all points inside the poly, in curve order. Only indices below maxidx are used.
+    The indices of a quadrant of level m, [k*4^m,(k+1)*4^m), cover an aligned square of 2^m x 2^m points. Quadrants outside the poly are skipped,
+    quadrants completely inside are taken as a whole, only quadrants on the boundary are split further. Below leafLevel the points are tested one by one.
+    """
+    shapely.prepare(poly)
+    runs=[]
+    def addRun(start:int,end:int)->None:
+        if runs and runs[-1][1]==start:
+            runs[-1][1]=end
+        else:
+            runs.append([start,end])
+    stack=[(0,iterationCount)]
+    while stack:
+        start,level=stack.pop()
+        if start>=maxidx:
+            continue
+        end=min(start+4**level,maxidx)
+        if level<=leafLevel:
+            x,y=toXY(decode(np.arange(start,end),2,iterationCount))
+            inside=shapely.contains_xy(poly,x,y)
+            for ids in np.flatnonzero(inside):
+                addRun(start+int(ids),start+int(ids)+1)
+            continue
+        corner=decode(np.array([start]),2,iterationCount)>>np.uint64(level)<<np.uint64(level)
+        x0,y0=toXY(corner)
+        x1,y1=toXY(corner+np.uint64(2**level-1))
+        cell=shapely.box(x0[0],y0[0],x1[0],y1[0])
+        if not poly.intersects(cell):
+            continue
+        if poly.contains_properly(cell):
+            addRun(start,end)
+            continue
+        quarter=4**(level-1)
+        stack.extend((start+q*quarter,level-1) for q in reversed(range(4)))# first quadrant on top, keeps the curve order
+    return [tuple(run) for run in runs]
+
 def hilbert2GCode(allhilbertpts:list,parameters:dict,layerheight:float):
     hilbertGCode=[]
     eStepsPerMM=calcEStepsPerMM(parameters,layerheight)
+    if parameters.get("HilbertMergeCollinear"):
+        allhilbertpts=[[p for p,keep in zip(curvepts,getCollinearMask(np.array([[p.x,p.y] for p in curvepts]))) if keep] for curvepts in allhilbertpts]
     for idc,curvepts in enumerate(allhilbertpts):
         for idp,p in enumerate(curvepts):
             if idp==0:
@@ -1183,15 +2972,268 @@ def hilbert2GCode(allhilbertpts:list,parameters:dict,layerheight:float):
     hilbertGCode.append(retractGCode(True,parameters))    
     return hilbertGCode 
 
+################################# HELPER FUNCTIONS Instance Deduplication #################################
+####################################################################################################
+# Multiple instances of an object give the same overhang at shifted positions. The arcs are generated once per shape and copied.
+
+def getShapeKeys(poly:Polygon,tolerance:float)->tuple:
+    """Translation invariant hash of an overhang: number of holes and size, in steps of 10x the tolerance.
+    Returns the key of the poly, the keys of the neighbouring steps a copy might fall into and the offset (lower left corner) to move the arcs to their position.
+    The vertices themselves are not hashed, shifted copies differ in collinear and snapped points. The match is verified by findDuplicate()."""
+    offset=np.array(poly.bounds[:2])
+    size=np.array(poly.bounds[2:])-offset
+    step=10*tolerance
+    key=(len(poly.interiors),*np.floor(size/step).astype(int).tolist())
+    neighbours={(len(poly.interiors),int(np.floor(w/step)),int(np.floor(h/step))) for w in (size[0]-2*tolerance,size[0]+2*tolerance) for h in (size[1]-2*tolerance,size[1]+2*tolerance)}
+    return key,neighbours|{key},offset
+
+def findDuplicate(candidates:list,poly:Polygon,startLineString,offset:np.ndarray,tolerance:float):
+    """Returns the cached entry whose overhang and start line, shifted onto this one, differ by at most the tolerance. None if no match."""
+    for entry in candidates:
+        shift=offset-entry[0]
+        moved=shapely.transform([entry[1],entry[2]],lambda coords:coords+shift)
+        if shapely.hausdorff_distance(moved[0],poly)<=tolerance and shapely.hausdorff_distance(moved[1],startLineString)<=tolerance:
+            return entry
+    return None
+
+def translateArcs(arcs:list,offset:np.ndarray)->list:
+    """Shifted copies of the arcs, the order and the groups for the travel optimization are kept."""
+    moved=[]
+    for arc in arcs:
+        copy=Arc(Point(arc.center.x+offset[0],arc.center.y+offset[1]),arc.r,pointsPerCircle=arc.pointsPerCircle)
+        copy.group=arc.group
+        copy.parentGroup=arc.parentGroup
+        copy.arcline=arc.arcline+offset
+        moved.append(copy)
+    return moved
+
+################################# HELPER FUNCTIONS Parameter Sweep #################################
+####################################################################################################
+# The file is read and the overhangs are detected once, every combination of the sweep grid only generates the arcs, in parallel processes.
+
+SWEEP_DETECTION_PARAMETERS=("ExtendIntoPerimeter","MinArea","MinBridgeLength","CheckForAllowedSpace","AllowedSpaceForArcs","specialCoolingZdist","notPerformPerimeterCheck","travel_speed",
+    "InfillBufferQuadSegs","InfillBufferJoinStyle","InfillMergeGridSize","InfillMergeSimplifyTolerance")
+
+def detectOverhangs(layers:list,parameters:dict,layerZ:list=None)->dict:
+    """
+    The overhang detection of processLayers() without arc generation, returns layernumber->(validpolys,startGeometries).
+    Like in processLayers() the modified layers are replaced by new, empty layers before the next layer looks for its start geometry.
+    If layerZ is given, the z of every layer is appended.
+    """
+    detection={}
+    layerobjs=[]
+    coolingZ=[]# maxZ of the special cooling above each overhang
+    for idl,layerlines in enumerate(layers):
+        layer=Layer(layerlines,parameters,idl)
+        layer.addZ()
+        layerobjs.append(layer)
+        if layerZ is not None:
+            layerZ.append(layer.z)
+        isCooled=len(coolingZ)>0
+        coolingZ=[z for z in coolingZ if layer.z<=z]
+        if idl<1:
+            continue
+        startGeometries=detectOverhangPolys(layer,layerobjs[idl-1],parameters)
+        if layer.validpolys:
+            detection[idl]=(layer.validpolys,startGeometries)
+            coolingZ.append(layer.z+parameters.get("specialCoolingZdist"))
+        if layer.validpolys or isCooled:
+            layerobjs[idl]=Layer([],parameters,idl)
+        layerobjs[idl-1].releaseGeometry()
+    return detection
+
+def makeSweepVariants(grid:dict)->list:
+    """All combinations of the grid as override dicts."""
+    keys=list(grid.keys())
+    for key in keys:
+        if key in SWEEP_DETECTION_PARAMETERS:
+            raise ValueError(f"Sweep: {key} changes the overhang detection, only parameters of the arc generation can be swept.")
+    values=[val if isinstance(val,(list,tuple)) else [val] for val in grid.values()]
+    return [dict(zip(keys,combination)) for combination in itertools.product(*values)]
+
+def getSweepOutputPath(path2GCode:str,variant:dict)->str:
+    """model.gcode -> model_ArcWidth0.4_RMax10.gcode, the extension(s) are kept."""
+    directory,filename=os.path.split(path2GCode)
+    stem,dot,extension=filename.partition(".")
+    tag="_".join(f"{key}{val}" for key,val in variant.items())
+    return os.path.join(directory,f"{stem}_{tag}{dot}{extension}")
+
+sweepWorkerState={}
+
+def initSweepWorker(layers:list,settingLines:list,detection:dict,parameters:dict)->None:
+    """Runs once per worker process, the shared data is not sent again for every variant."""
+    sweepWorkerState.update(layers=layers,settingLines=settingLines,detection=detection,parameters=parameters)
+    logger.setLevel(logging.WARNING)# the progress messages of parallel variants would be mixed up
+
+def runSweepVariant(variant:dict,path2Output:str,outputFormat:str,path2GCode:str)->dict:
+    """Generate the arcs for one variant and write its file. Returns the row for the csv."""
+    state=sweepWorkerState
+    parameters=dict(state["parameters"])
+    parameters.update(variant)
+    parameters["RunSummary"]=RunSummary()
+    t=time.perf_counter()
+    source=BGCodeReader(path2GCode) if outputFormat=="bgcode" else None # only for the metadata blocks
+    f=openGCodeWriter(path2Output,outputFormat,source)
+    result={}
+    layers=list(processLayers(state["layers"],state["settingLines"],parameters,result,detection=state["detection"]))
+    if result.get("rewriteProgress"):
+        layers=result["rewriteProgress"](itertools.chain.from_iterable(layers))
+    for lines in layers:
+        f.writelines(lines)
+    f.close()
+    if source:
+        source.close()
+    counters=parameters.get("RunSummary").counters
+    area=counters.get("Overhang area [mm^2]",0)
+    row=dict(variant)
+    row.update({
+        "output":path2Output,
+        "filled [%]":round(100*counters.get("Arc filled area [mm^2]",0)/area,2) if area else 0,
+        "arcs":counters.get("Arcs",0),
+        "arc generation [s]":round(parameters.get("RunSummary").timers.get("Arc generation",0),3),
+        "total [s]":round(time.perf_counter()-t,3),
+        })
+    return row
+
+def runSweep(gCodeFileStream,path2GCode:str,inputFormat:str,settingLines:list,parameters:dict,overrides:dict=None)->list:
+    """Write one file per combination of the Sweep grid and a csv (<input>_sweep.csv) with the results. Returns the csv rows."""
+    variants=makeSweepVariants(parameters.get("Sweep"))
+    t=time.perf_counter()
+    layers=list(splitGCodeIntoLayers(gCodeFileStream))
+    gCodeFileStream.close()
+    parameters=dict(parameters)
+    parameters.pop("Sweep")
+    del parameters["RunSummary"]# every variant gets its own
+    detection=detectOverhangs(layers,dict(parameters,RunSummary=RunSummary()))
+    log(f"Sweep: {len(detection)} layers with overhangs detected in {time.perf_counter()-t:.2f}s, {len(variants)} variants")
+    outputFormat=parameters.get("OutputFormat","auto")
+    if outputFormat=="auto":
+        outputFormat=inputFormat
+    rows=[]
+    workers=parameters.get("SweepWorkers") or None
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers,initializer=initSweepWorker,initargs=(layers,settingLines,detection,parameters)) as pool:
+        futures=[pool.submit(runSweepVariant,variant,getSweepOutputPath(path2GCode,variant),outputFormat,path2GCode) for variant in variants]
+        for future in futures:
+            row=future.result()
+            log(f"Sweep: {row['output']}: {row['filled [%]']}% filled, {row['arcs']} arcs, {row['arc generation [s]']}s")
+            rows.append(row)
+    path2CSV=os.path.splitext(path2GCode[:-3] if path2GCode.endswith(".gz") else path2GCode)[0]+"_sweep.csv"
+    with open(path2CSV,"w",newline="") as f:
+        writer=csv.DictWriter(f,fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    log(f"Sweep: results written to {path2CSV}, {time.perf_counter()-t:.2f}s")
+    return rows
+
+################################# HELPER FUNCTIONS Analysis #################################
+####################################################################################################
+# Dry run: only the overhang detection, the number of arcs and the runtime of the arc generation are rough estimates fitted to 22 measured runs
+# (the example file with RMax 10-110mm and ArcWidth 0.38/0.6mm, rectangles and wavy shapes of 100-6400mm^2, exact engine).
+# Arcs within -20%/+25%, seconds typically within a factor of 1.5, worst case 2.5.
+
+COST_MODEL={
+    "arcs":(0.82,1.02), # factors of RMax/ArcWidth (the arcs around the first center) and area/(ArcWidth*RMax) (the arcs around the following centers)
+    "seconds":(4.23e-4,0.90,0.515,0.169), # factor, exponents of the predicted arcs, the number of centers area/RMax^2+1 and the number of vertices
+    "referenceSeconds":0.042, # runtime of the reference overhang on the machine the model was fitted on
+    }
+
+def measureSpeedFactor(parameters:dict)->float:
+    """Runtime of a reference overhang (20x15mm, RMax 10mm) with the given parameters, relative to the machine the cost model was fitted on."""
+    poly=Polygon([[0,0],[20,0],[20,15],[0,15]])
+    startLineString=LineString([[0,0],[20,0]])
+    boundaryWithOutStartLine=poly.boundary.difference(startLineString.buffer(1e-2))
+    times=[]
+    for _ in range(3):
+        referenceParameters=dict(parameters,RMax=10,ArcWidth=0.38,RunSummary=RunSummary())
+        t=time.perf_counter()
+        generateArcsInPoly(poly,startLineString,boundaryWithOutStartLine,referenceParameters,0)
+        times.append(time.perf_counter()-t)
+    return min(times)/COST_MODEL["referenceSeconds"]
+
+def predictArcGeneration(poly:Polygon,parameters:dict,speedFactor:float=1)->tuple:
+    """Predicted number of arcs and runtime in s for an overhang."""
+    w=parameters.get("ArcWidth")
+    rMax=parameters.get("RMax")/w
+    area=poly.area/w**2
+    vertices=len(shapely.get_coordinates(poly))
+    factorR,factorA=COST_MODEL["arcs"]
+    arcs=factorR*rMax+factorA*area/rMax
+    factor,expArcs,expCenters,expV=COST_MODEL["seconds"]
+    seconds=factor*arcs**expArcs*(area/rMax**2+1)**expCenters*vertices**expV*speedFactor
+    return arcs,seconds
+
+def getCooledLayers(layerZ:list,idl:int,coolingZdist:float)->list:
+    """Layers after layer idl that get the special cooling, like in processLayers(): up to and including the first layer above z+coolingZdist."""
+    cooled=[]
+    for idc in range(idl+1,len(layerZ)):
+        cooled.append(idc)
+        if layerZ[idc]>layerZ[idl]+coolingZdist:
+            break
+    return cooled
+
+def analyzeOverhangs(gCodeFileStream,path2GCode:str,parameters:dict)->dict:
+    """Detect the overhangs without generating arcs and write the report to <input>_analysis.json. Returns the report."""
+    t=time.perf_counter()
+    layers=list(splitGCodeIntoLayers(gCodeFileStream))
+    gCodeFileStream.close()
+    layerZ=[]
+    detection=detectOverhangs(layers,parameters,layerZ)
+    speedFactor=measureSpeedFactor(parameters)
+    report={
+        "input":path2GCode,
+        "parameters":{key:parameters.get(key) for key in ("ArcWidth","RMax","ArcEngine","ArcSeedingEngine","PointsPerCircle","MinArea","MinBridgeLength","ExtendIntoPerimeter","specialCoolingZdist")},
+        "speedFactor":round(speedFactor,3),
+        "predictionAccuracy":"rough estimates: predictedArcs within -20%/+25%, predictedSeconds within a factor of 2.5 in the calibration runs",
+        "layers":[],
+        }
+    total={"overhangs":0,"area [mm^2]":0,"predictedArcs":0,"predictedSeconds":0}
+    for idl,(validpolys,startGeometries) in sorted(detection.items()):
+        overhangs=[]
+        for poly,(startLineString,_) in zip(validpolys,startGeometries):
+            arcs,seconds=predictArcGeneration(poly,parameters,speedFactor)
+            overhangs.append({
+                "area [mm^2]":round(poly.area,2),
+                "boundingBox":[round(val,3) for val in poly.bounds],
+                "vertices":len(shapely.get_coordinates(poly)),
+                "startLineLength":round(startLineString.length,3) if startLineString is not None else None,# no start line: skipped by the arc generation
+                "predictedArcs":int(round(arcs)) if startLineString is not None else 0,
+                "predictedSeconds":round(seconds,3) if startLineString is not None else 0,
+                })
+            total["overhangs"]+=1
+            total["area [mm^2]"]+=poly.area
+            total["predictedArcs"]+=overhangs[-1]["predictedArcs"]
+            total["predictedSeconds"]+=overhangs[-1]["predictedSeconds"]
+        report["layers"].append({"layer":idl,"z":layerZ[idl],"overhangs":overhangs,"specialCoolingLayers":getCooledLayers(layerZ,idl,parameters.get("specialCoolingZdist"))})
+    total["area [mm^2]"]=round(total["area [mm^2]"],2)
+    total["predictedSeconds"]=round(total["predictedSeconds"],3)
+    total["analysisSeconds"]=round(time.perf_counter()-t,3)
+    report["total"]=total
+    path2Report=os.path.splitext(path2GCode[:-3] if path2GCode.endswith(".gz") else path2GCode)[0]+"_analysis.json"
+    with open(path2Report,"w") as f:
+        json.dump(report,f,indent=1)
+    log(f"Analysis: {total['overhangs']} overhangs in {len(detection)} layers, predicted {total['predictedArcs']} arcs in {total['predictedSeconds']:.1f}s. Report written to {path2Report}")
+    return report
+
 def _warning(message,category = UserWarning, filename = '', lineno = -1,*args, **kwargs):
     print(f"{filename}:{lineno}: {message}")
-warnings.showwarning = _warning
+
+class ConsoleFormatter(logging.Formatter):
+    """Messages like print(), warnings with their position in the code."""
+    def format(self,record:logging.LogRecord)->str:
+        if record.levelno>=logging.WARNING:
+            return f"{record.pathname}:{record.lineno}: {record.getMessage()}"
+        return record.getMessage()
 
 ################################# MAIN EXECUTION #################################
 ##################################################################################
 if __name__=="__main__":
+    warnings.showwarning = _warning
+    consoleHandler=logging.StreamHandler(sys.stdout)
+    consoleHandler.setFormatter(ConsoleFormatter())
+    logger.addHandler(consoleHandler)
+    logger.setLevel(logging.INFO)
     gCodeFileStream,path2GCode = getFileStreamAndPath()
     skipInput=False
     if platform.system()!="Windows":
         skipInput=True
-    main(gCodeFileStream,path2GCode, skipInput)
+    main(gCodeFileStream,path2GCode, skipInput,getCommandLineOverrides())